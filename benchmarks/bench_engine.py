@@ -0,0 +1,365 @@
+'''
+Throughput benchmarks for the engine hot paths.
+
+Run from the repository root:
+
+    python benchmarks/bench_engine.py
+    python benchmarks/bench_engine.py --only proceed showdown
+    python benchmarks/bench_engine.py --compare benchmarks/results/<old>.json
+
+Every run writes its results to benchmarks/results/<commit>.json (or --output),
+so two commits can be compared with --compare.
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import engine
+import states
+from engine import (RoundState, TerminalState, Game, Player, LazyDeck, FoldAction, CallAction,
+                    CheckAction, RaiseAction, DiscardAction)
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+SKELETONS = {
+    'python': ('python_skeleton', 'python3'),
+    'cpp': ('cpp_skeleton', 'cmake'),
+    'java': ('java_skeleton', 'javac'),
+}
+
+# Scripted lines through one round, replayed by the proceed benchmark.
+# Each covers a different set of transitions (blinds, discards, streets, raises).
+LINES = [
+    [FoldAction()],
+    [CallAction(), CheckAction(), DiscardAction(0), CheckAction(), DiscardAction(1), CheckAction(),
+     CheckAction(), CheckAction(), CheckAction(), CheckAction(), CheckAction(), CheckAction()],
+    [RaiseAction(6), CallAction(), DiscardAction(2), CheckAction(), DiscardAction(0), CheckAction(),
+     RaiseAction(10), FoldAction()],
+    [RaiseAction(6), RaiseAction(18), CallAction(), DiscardAction(1), CheckAction(), DiscardAction(1),
+     CheckAction(), CheckAction(), RaiseAction(20), CallAction(), RaiseAction(40), CallAction(),
+     CheckAction(), CheckAction()],
+]
+
+
+class StubPlayer():
+    '''
+    An in-process stand-in for Player which answers queries with a seeded random policy.
+    '''
+
+    def __init__(self, name, seed):
+        self.name = name
+        self.bankroll = 0
+        self.game_clock = engine.STARTING_GAME_CLOCK
+        self.last_latency = 0.
+        self.capabilities = set()
+        self.rng = random.Random(seed)
+
+    def query(self, round_state, player_message, game_log):
+        '''
+        Returns a legal action without any socket traffic.
+        '''
+        del player_message[1:]
+        if isinstance(round_state, TerminalState):
+            return CheckAction()
+        legal_actions = round_state.legal_actions()
+        if DiscardAction in legal_actions:
+            return DiscardAction(self.rng.randrange(3))
+        if RaiseAction in legal_actions and self.rng.random() < 0.3:
+            min_raise, max_raise = round_state.raise_bounds()
+            return RaiseAction(self.rng.randint(min_raise, max_raise))
+        if CheckAction in legal_actions:
+            return CheckAction()
+        return FoldAction() if self.rng.random() < 0.25 else CallAction()
+
+
+@contextlib.contextmanager
+def scratch_directory():
+    '''
+    Runs the body inside a temporary working directory, so player and game logs do not land in the repo.
+    '''
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(cwd)
+
+
+def timed(body, duration):
+    '''
+    Calls body() repeatedly for about duration seconds.
+    body returns the number of operations it performed; returns operations per second.
+    '''
+    operations = 0
+    start = time.perf_counter()
+    elapsed = 0.
+    while elapsed < duration:
+        operations += body()
+        elapsed = time.perf_counter() - start
+    return operations / elapsed
+
+
+def bench_proceed(args):
+    '''
+    RoundState.proceed transitions per second over the scripted lines.
+    '''
+    deck = LazyDeck(random.Random(args.seed))
+    hands = [deck.deal(3), deck.deal(3)]
+    pips = [engine.SMALL_BLIND, engine.BIG_BLIND]
+    stacks = [engine.STARTING_STACK - engine.SMALL_BLIND, engine.STARTING_STACK - engine.BIG_BLIND]
+
+    def body():
+        transitions = 0
+        for line in LINES:
+            # discards pop from the hands and extend the board in place, so each line gets fresh lists
+            round_state = RoundState(0, 0, pips, stacks, [list(hands[0]), list(hands[1])], deck, [], None)
+            for action in line:
+                round_state = round_state.proceed(action)
+                transitions += 1
+        return transitions
+    return {'value': timed(body, args.duration), 'unit': 'transitions/s', 'higher_is_better': True}
+
+
+def bench_showdown(args):
+    '''
+    RoundState.showdown evaluations per second on random six-card boards.
+    '''
+    rng = random.Random(args.seed)
+    states = []
+    for _ in range(256):
+        deck = LazyDeck(rng)
+        cards = deck.deal(10)
+        stack = engine.STARTING_STACK - rng.randint(2, engine.STARTING_STACK)
+        states.append(RoundState(1, 6, [0, 0], [stack, stack], [cards[0:2], cards[2:4]], deck, cards[4:10], None))
+
+    def body():
+        for state in states:
+            state.showdown()
+        return len(states)
+    return {'value': timed(body, args.duration), 'unit': 'showdowns/s', 'higher_is_better': True}
+
+
+def bench_run_round(args):
+    '''
+    Game.run_round rounds per second between two in-process stub players.
+    '''
+    game = Game()
+    players = [StubPlayer(engine.PLAYER_1_NAME, args.seed), StubPlayer(engine.PLAYER_2_NAME, args.seed + 1)]
+
+    def body():
+        nonlocal players
+        for _ in range(100):
+            game.run_round(players)
+            players = players[::-1]
+        del game.log[1:]
+        return 100
+    return {'value': timed(body, args.duration), 'unit': 'rounds/s', 'higher_is_better': True}
+
+
+def launch(language):
+    '''
+    Builds and connects two copies of a skeleton bot, or returns None if its toolchain is missing.
+    '''
+    directory, tool = SKELETONS[language]
+    if shutil.which(tool) is None:
+        return None
+    path = os.path.join(ROOT, directory)
+    players = [Player(engine.PLAYER_1_NAME, path), Player(engine.PLAYER_2_NAME, path)]
+    for player in players:
+        player.build()
+    for player in players:
+        player.run()
+    if any(player.socketfile is None for player in players):
+        for player in players:
+            player.stop()
+        return None
+    return players
+
+
+def measure_latency(language, rounds):
+    '''
+    Plays rounds between two copies of a skeleton and returns its latency result.
+    '''
+    with scratch_directory():
+        with contextlib.redirect_stdout(io.StringIO()):
+            players = launch(language)
+        if players is None:
+            return {'skipped': 'toolchain missing or bot failed to start'}
+        elapsed = 0.
+        queries = 0
+        for player in players:
+            query = player.query
+
+            def timed_query(round_state, player_message, game_log, query=query):
+                nonlocal elapsed, queries
+                start = time.perf_counter()
+                action = query(round_state, player_message, game_log)
+                elapsed += time.perf_counter() - start
+                queries += 1
+                return action
+            player.query = timed_query
+        game = Game()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(rounds):
+                game.run_round(players)
+                players = players[::-1]
+            for player in players:
+                player.stop()
+    return {'value': 1e6 * elapsed / queries, 'unit': 'us/action', 'higher_is_better': False}
+
+
+def bench_latency(args):
+    '''
+    Mean socket round-trip latency per action for each skeleton language.
+    '''
+    return {'latency_' + language: measure_latency(language, args.latency_rounds) for language in SKELETONS}
+
+
+def bench_transport(args):
+    '''
+    Mean round-trip latency per action over TCP and over shared memory, for the skeletons supporting both.
+    '''
+    results = {}
+    saved = engine.TRANSPORT
+    try:
+        for language in ('python', 'cpp'):
+            for transport in ('tcp', 'shm'):
+                engine.TRANSPORT = transport
+                results['transport_{}_{}'.format(language, transport)] = measure_latency(
+                    language, args.latency_rounds)
+    finally:
+        engine.TRANSPORT = saved
+    return results
+
+
+def bench_match(args):
+    '''
+    Wall time of a complete match between two Python skeleton bots.
+    '''
+    path = os.path.join(ROOT, 'python_skeleton')
+    saved = engine.NUM_ROUNDS, engine.NUM_TABLES, engine.PLAYER_1_PATH, engine.PLAYER_2_PATH
+    engine.NUM_ROUNDS, engine.NUM_TABLES, engine.PLAYER_1_PATH, engine.PLAYER_2_PATH = (
+        args.match_rounds, args.match_tables, path, path)
+    try:
+        with scratch_directory():
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                Game().run()
+                elapsed = time.perf_counter() - start
+    finally:
+        engine.NUM_ROUNDS, engine.NUM_TABLES, engine.PLAYER_1_PATH, engine.PLAYER_2_PATH = saved
+    unit = 's/{}-round match'.format(args.match_rounds)
+    if args.match_tables > 1:
+        unit += ' on {} tables'.format(args.match_tables)
+    return {'value': elapsed, 'unit': unit, 'higher_is_better': False}
+
+
+BENCHMARKS = {
+    'proceed': bench_proceed,
+    'showdown': bench_showdown,
+    'run_round': bench_run_round,
+    'latency': bench_latency,
+    'transport': bench_transport,
+    'match': bench_match,
+}
+
+
+def current_commit():
+    '''
+    Returns the short hash of HEAD, marked dirty if the tree has local changes.
+    '''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, check=True,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if dirty else '')
+
+
+def compare(results, baseline, threshold):
+    '''
+    Prints the change against a previous results file and returns the names of regressed benchmarks.
+    '''
+    regressions = []
+    print()
+    print('Compared with {} ({})'.format(baseline['commit'], baseline['timestamp']))
+    for name, result in results.items():
+        old = baseline['results'].get(name)
+        if 'value' not in result or old is None or 'value' not in old:
+            continue
+        change = (result['value'] - old['value']) / old['value']
+        worse = -change if result['higher_is_better'] else change
+        flag = ''
+        if worse > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print('{:<22} {:>14.1f} -> {:>14.1f} {:<20} {:+.1%}{}'.format(
+            name, old['value'], result['value'], result['unit'], change, flag))
+    return regressions
+
+
+def parse_args():
+    '''
+    Parses the benchmark selection and output options.
+    '''
+    parser = argparse.ArgumentParser(prog='python benchmarks/bench_engine.py')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Benchmarks to run, defaults to all')
+    parser.add_argument('--duration', type=float, default=2.0, help='Seconds spent on each throughput benchmark')
+    parser.add_argument('--latency-rounds', type=int, default=200, help='Rounds played per skeleton for latency')
+    parser.add_argument('--match-rounds', type=int, default=1000, help='Rounds in the full match benchmark')
+    parser.add_argument('--match-tables', type=int, default=1, help='Tables played at once in the match benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the stub players and random boards')
+    parser.add_argument('--output', type=str, help='Results file, defaults to benchmarks/results/<commit>.json')
+    parser.add_argument('--compare', type=str, help='Previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.05, help='Relative slowdown reported as a regression')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = {}
+    for name in args.only or BENCHMARKS:
+        result = BENCHMARKS[name](args)
+        results.update(result if 'value' not in result and 'skipped' not in result else {name: result})
+    for name, result in results.items():
+        if 'value' in result:
+            print('{:<22} {:>14.1f} {}'.format(name, result['value'], result['unit']))
+        else:
+            print('{:<22} skipped: {}'.format(name, result['skipped']))
+    commit = current_commit()
+    report = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'compiled_states': not states.__file__.endswith('.py'),
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, commit + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as results_file:
+        json.dump(report, results_file, indent=2)
+    print('Wrote', output)
+    if args.compare is not None:
+        with open(args.compare, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+'''
+Generates preflop_equity.bin, a table of every 3-card starting hand's equity, for all three skeletons.
+
+Run from the repository root (needs numpy):
+
+    python build_preflop.py
+    python build_preflop.py --samples 100000 --seed 2
+
+The 22,100 starting hands fall into 1,755 classes that differ only by a relabelling of the
+suits, so equity is simulated once per class. Each deal gives a random opponent three cards
+and plays out the flop, both discards, the turn and the river as the engine does: the big
+blind (active 1) discards first and the small blind sees that card before discarding. Each
+player keeps the two cards that make the best hand with the board so far, leaving out the
+card being discarded. The same deals are scored from both seats, and a hand's equity is
+its share of the pot at showdown, with nobody folding.
+
+File format, all little-endian:
+
+    4 bytes   b'PFE3'
+    uint32    number of classes
+    uint32    deals sampled per class
+    uint16    class of each 3-card hand, 22,100 entries indexed by a + b(b-1)/2 + c(c-1)(c-2)/6
+              for card indices a < b < c, where a card's index is 4 * rank + suit
+              ('23456789TJQKA', 'cdhs')
+    uint16    equity * 65535 of each class, for active 0 and then active 1
+'''
+import argparse
+import itertools
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, 'python_skeleton'))
+
+from skeleton.evaluator import add_cards, score
+
+MAGIC = b'PFE3'
+SKELETONS = ['python_skeleton', 'cpp_skeleton', 'java_skeleton']
+FILENAME = 'preflop_equity.bin'
+KEEPS = [(1, 2), (0, 2), (0, 1)]  # the cards kept for each discard choice
+
+
+def canonical(hand):
+    '''
+    Returns the same key for every hand that differs from this one only by its suits.
+    '''
+    return min(tuple(sorted((card // 4, suits[card % 4]) for card in hand))
+               for suits in itertools.permutations(range(4)))
+
+
+def hand_classes():
+    '''
+    Returns the class of every 3-card hand, in combination order, and one hand of each class.
+    '''
+    hands = list(itertools.combinations(range(52), 3))  # in the order of the index a + C(b, 2) + C(c, 3)
+    hands.sort(key=lambda hand: (hand[2], hand[1], hand[0]))
+    keys = [canonical(hand) for hand in hands]
+    ids = {key: i for i, key in enumerate(sorted(set(keys)))}
+    representatives = {}
+    for hand, key in zip(hands, keys):
+        representatives.setdefault(ids[key], hand)
+    return np.array([ids[key] for key in keys], dtype=np.uint16), [representatives[i] for i in range(len(ids))]
+
+
+def hand_values(*cards):
+    '''
+    Returns the scores of the hands made by these cards, one array (or card) per card.
+    '''
+    masks = (0, 0, 0, 0, 0)
+    for card in cards:
+        masks = add_cards(masks, card)
+    return score(masks)
+
+
+def discard(hand, board):
+    '''
+    Returns the two cards kept and the card discarded from each 3-card hand, given the board so far.
+    '''
+    values = np.stack([hand_values(hand[:, a], hand[:, b], *board) for a, b in KEEPS])
+    choice = values.argmax(axis=0)
+    rows = np.arange(len(hand))
+    kept = np.array(KEEPS)[choice]
+    return hand[rows, kept[:, 0]], hand[rows, kept[:, 1]], hand[rows, choice]
+
+
+def shares(mine, theirs):
+    return (mine > theirs) + 0.5 * (mine == theirs)
+
+
+def hand_equity(hand, samples, rng):
+    '''
+    Returns the simulated equity of a 3-card hand as active 0 and as active 1.
+    '''
+    deck = np.array([card for card in range(52) if card not in hand])
+    deals = deck[rng.random((samples, len(deck))).argsort(axis=1)[:, :7]]
+    theirs, flop, turn, river = deals[:, :3], [deals[:, 3], deals[:, 4]], deals[:, 5], deals[:, 6]
+    mine = np.broadcast_to(np.array(hand), (samples, 3))
+    # active 0 discards second
+    first = discard(theirs, flop)
+    second = discard(mine, flop + [first[2]])
+    board = flop + [first[2], second[2], turn, river]
+    small_blind = shares(hand_values(*second[:2], *board), hand_values(*first[:2], *board)).mean()
+    # active 1 discards first
+    first = discard(mine, flop)
+    second = discard(theirs, flop + [first[2]])
+    board = flop + [first[2], second[2], turn, river]
+    big_blind = shares(hand_values(*first[:2], *board), hand_values(*second[:2], *board)).mean()
+    return small_blind, big_blind
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generates the preflop equity table for the skeletons.')
+    parser.add_argument('--samples', type=int, default=20000, help='deals simulated per hand class')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    classes, representatives = hand_classes()
+    start = time.perf_counter()
+    equities = np.empty((len(representatives), 2))
+    for i, hand in enumerate(representatives):
+        equities[i] = hand_equity(hand, args.samples, rng)
+        if (i + 1) % 100 == 0:
+            print('{}/{} classes, {:.0f} s'.format(i + 1, len(representatives), time.perf_counter() - start))
+    data = (MAGIC + struct.pack('<II', len(representatives), args.samples)
+            + classes.astype('<u2').tobytes() + np.round(equities * 65535).astype('<u2').tobytes())
+    for skeleton in SKELETONS:
+        with open(os.path.join(ROOT, skeleton, FILENAME), 'wb') as f:
+            f.write(data)
+    print('Wrote {} ({} bytes) to {}'.format(FILENAME, len(data), ', '.join(SKELETONS)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
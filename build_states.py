@@ -0,0 +1,33 @@
+'''
+Compiles the round state module with Cython, in place.
+
+Run from the repository root:
+
+    python build_states.py
+
+Python imports the compiled extension instead of states.py from then on. Delete the
+generated states.*.so (states.*.pyd on Windows) to go back to plain Python, and rebuild
+after editing states.py, since the extension does not notice changes to it.
+'''
+import os
+import sys
+import tempfile
+
+from Cython.Build import cythonize
+from setuptools import setup
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    os.chdir(ROOT)
+    with tempfile.TemporaryDirectory() as build_temp:
+        # explicit (empty) package lists stop setuptools from scanning the repository layout
+        setup(ext_modules=cythonize(['states.py'], language_level=3, quiet=True),
+              packages=[], py_modules=[],
+              script_args=['build_ext', '--inplace', '--build-temp', build_temp, '--build-lib', build_temp])
+    os.remove('states.c')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
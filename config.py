@@ -8,13 +8,64 @@ PLAYER_2_NAME = "B"
 PLAYER_2_PATH = "./python_skeleton"
 # GAME PROGRESS IS RECORDED HERE
 GAME_LOG_FILENAME = "gamelog"
+# STREAMS ONE JSON LINE PER DEAL, ACTION, STREET AND ROUND RESULT WHILE THE GAME RUNS
+# SET TO A FILE OR FIFO PATH, OR "unix:<path>" TO CONNECT TO A LOCAL SOCKET; None DISABLES THE STREAM
+EVENT_STREAM = None
+# EVENTS ARE DROPPED INSTEAD OF STALLING THE GAME ONCE THIS MANY ARE WAITING TO BE WRITTEN
+EVENT_QUEUE_SIZE = 65536
+# REPLAYS THE DEALS OF A MATCH RECORDED WITH EVENT_STREAM; None PLAYS FRESH DEALS
+# ROUNDS BEFORE REPLAY_FROM_ROUND ALSO REPLAY THE RECORDED ACTIONS WITHOUT CALLING THE BOTS
+REPLAY_FILENAME = None
+REPLAY_FROM_ROUND = 1
+# SAVES THE MATCH STATE EVERY CHECKPOINT_INTERVAL ROUNDS; None DISABLES CHECKPOINTS
+# A MATCH STARTED WHILE THE CHECKPOINT FILE EXISTS RESUMES FROM IT, AND THE FILE IS REMOVED WHEN THE MATCH ENDS
+# THE BOTS ARE TOLD THE ROUND THE MATCH RESUMES FROM WITH AN N CLAUSE IN THEIR FIRST MESSAGE
+CHECKPOINT_FILENAME = None
+CHECKPOINT_INTERVAL = 1000
+# PLAYS THIS MANY TABLES AT ONCE, SENDING EACH BOT ALL OF ITS PENDING DECISIONS IN ONE MESSAGE
+# BOTH BOTS MUST LIST "batch" UNDER "capabilities" IN commands.json, OTHERWISE ONE TABLE IS PLAYED
+NUM_TABLES = 1
+# "shm" EXCHANGES MESSAGES WITH BOTS THAT LIST "shm" UNDER "capabilities" THROUGH SHARED-MEMORY RING BUFFERS
+# INSTEAD OF TCP (LINUX AND MACOS ON X86-64). A WAITING SIDE SPINS BRIEFLY BEFORE SLEEPING, SO THIS IS FASTEST
+# WITH THE ENGINE AND BOTS PINNED TO SEPARATE CPUS
+TRANSPORT = "tcp"
+# ENDS THE MATCH EARLY ONCE PLAYER_1'S WINNINGS PER ROUND ARE ABOVE OR BELOW ZERO AT THIS CONFIDENCE, E.G. 0.999,
+# WITH ALL-IN POTS SCORED AT THEIR EQUITY. IT IS CHECKED AFTER EVERY ROUND FROM STOP_MIN_ROUNDS ON, WHICH STOPS ON A
+# FLUKE MORE OFTEN THAN THE LEVEL SUGGESTS, SO PICK A HIGH ONE; None PLAYS EVERY ROUND
+STOP_CONFIDENCE = None
+STOP_MIN_ROUNDS = 200
 # PLAYER_LOG_SIZE_LIMIT IS IN BYTES
 PLAYER_LOG_SIZE_LIMIT = 524288
+# OUTPUT PAST THE LIMIT IS DROPPED AS IT ARRIVES, EXCEPT FOR THE LAST PLAYER_LOG_TAIL_LINES LINES
+# LINES ARE SPLIT EVERY PLAYER_LOG_LINE_LIMIT BYTES, WHICH BOUNDS THE MEMORY KEPT FOR THE TAIL
+PLAYER_LOG_TAIL_LINES = 100
+PLAYER_LOG_LINE_LIMIT = 4096
+# CPU PINNING (LINUX), E.G. [2, 3]; None LEAVES A PROCESS FREE TO RUN ON ANY CPU
+# PIN EACH BOT AND THE ENGINE TO SEPARATE CPUS TO RUN SEVERAL MATCHES ON ONE MACHINE WITHOUT INTERFERENCE
+ENGINE_CPUS = None
+PLAYER_1_CPUS = None
+PLAYER_2_CPUS = None
+# PER-BOT RESOURCE LIMITS SET WITH setrlimit; None MEANS UNLIMITED
+# THE MEMORY LIMIT IS ON ADDRESS SPACE IN BYTES, SO JAVA BOTS ALSO NEED A MATCHING -Xmx
+# THEY APPLY TO THE RUN COMMAND ONLY; THE BUILD IS PINNED TO THE BOT'S CPUS BUT NOT LIMITED
+PLAYER_MEMORY_LIMIT = None
+PLAYER_CPU_TIME_LIMIT = None
 # STARTING_GAME_CLOCK AND TIMEOUTS ARE IN SECONDS
 ENFORCE_GAME_CLOCK = True
 STARTING_GAME_CLOCK = 60.0
+# HOW EACH QUERY IS CHARGED TO THE GAME CLOCK: "wall" TIMES FROM SENDING THE MESSAGE TO READING THE RESPONSE,
+# "response" STARTS ONCE THE ENGINE HAS FINISHED WRITING THE MESSAGE, AND "cpu" CHARGES THE CPU TIME USED BY
+# THE BOT'S PROCESSES (NEEDS /proc, OTHERWISE "response" IS CHARGED). ALL THREE ARE REPORTED IN THE GAME LOG
+GAME_CLOCK_MODE = "wall"
 BUILD_TIMEOUT = 10.0
+# ALSO THE LONGEST A BOT MAY TAKE OVER ONE DECISION; A REPLY STILL MISSING WHEN THE GAME CLOCK RUNS OUT IS NOT WAITED FOR
 CONNECT_TIMEOUT = 10.0
+# PROFILING WRITES <NAME>.prof (PYTHON), <NAME>.perf.data (C++) OR <NAME>.jfr (JAVA) NEXT TO THE PLAYER LOGS
+# PROFILER OVERHEAD COUNTS AGAINST THE GAME CLOCK, SO RAISE STARTING_GAME_CLOCK WHEN PROFILING
+# A BOT STILL RUNNING AFTER THE MATCH GETS SIGINT, SO ITS PROFILE IS WRITTEN, AND IS KILLED CONNECT_TIMEOUT LATER
+PROFILE_PLAYERS = False
+# WRITES engine.prof FOR THE ENGINE PROCESS ITSELF
+PROFILE_ENGINE = False
 # THE GAME VARIANT FIXES THE PARAMETERS BELOW
 # CHANGE ONLY FOR TRAINING OR EXPERIMENTATION
 NUM_ROUNDS = 1000
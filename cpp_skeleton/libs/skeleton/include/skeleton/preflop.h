@@ -0,0 +1,32 @@
+#pragma once
+
+#include <cstdint>
+#include <string>
+#include <vector>
+
+namespace pokerbots::skeleton {
+
+  /*
+    The equity table in preflop_equity.bin, generated by build_preflop.py in the repository root.
+
+    Holds the equity of every 3-card starting hand against a random hand, as the small blind
+    (active 0) and as the big blind (active 1), playing through both discards to showdown.
+    Hands that differ only by their suits share a class, numbered from 0 to numClasses - 1.
+  */
+  class PreflopTable {
+  public:
+    explicit PreflopTable(const std::string& path = "preflop_equity.bin");
+
+    int handClass(const std::vector<std::string>& cards) const;
+
+    double equity(const std::vector<std::string>& cards, int active) const;
+
+    int numClasses;
+    int samples;
+
+  private:
+    std::vector<std::uint16_t> classes;
+    std::vector<std::uint16_t> equities;
+  };
+
+} // namespace pokerbots::skeleton
@@ -1,11 +1,15 @@
 #pragma once
 
+#include <atomic>
 #include <charconv>
 #include <iostream>
 #include <optional>
 #include <string>
+#include <thread>
+#include <type_traits>
 #include <utility>
 #include <map>
+#include <memory>
 
 #include <boost/algorithm/string.hpp>
 #include <boost/asio/ip/tcp.hpp>
@@ -13,23 +17,59 @@
 #include "actions.h"
 #include "constants.h"
 #include "game.h"
+#include "shm.h"
 #include "states.h"
 
 namespace pokerbots::skeleton {
 
+  /*
+    Detects the optional ponder hook:
+
+      void ponder(GameInfoPtr gameState, const std::atomic<bool>& stop);
+
+    If the bot defines it, it runs on a worker thread after each response, while the bot waits for
+    the engine's next message, which is not charged to the game clock. stop becomes true as soon as
+    that message arrives, and the runner waits for ponder to return before calling anything else,
+    so check stop often.
+  */
+  template <typename BotType, typename = void> struct HasPonder : std::false_type {};
+
+  template <typename BotType>
+  struct HasPonder<BotType, std::void_t<decltype(std::declval<BotType&>().ponder(
+    std::declval<GameInfoPtr>(), std::declval<const std::atomic<bool>&>()))>> : std::true_type {};
+
   template <typename BotType> class Runner {
   private:
     BotType pokerbot;
     boost::asio::ip::tcp::iostream& stream;
+    std::unique_ptr<ShmStream> shm;
+    std::iostream* io;  // the TCP stream, or the shared-memory stream once the engine switches to it
+    std::thread worker;
+    std::atomic<bool> stopPondering{false};
+
+    void ponder(GameInfoPtr gameInfo) {
+      if constexpr (HasPonder<BotType>::value) {
+        stopPondering = false;
+        worker = std::thread([this, gameInfo] { pokerbot.ponder(gameInfo, stopPondering); });
+      }
+    }
+
+    void stopPonder() {
+      if (worker.joinable()) {
+        stopPondering = true;
+        worker.join();
+      }
+    }
 
     template <typename Action> void send(Action const& action) {
-      stream << action << '\n';
-      stream.flush();
+      *io << action << '\n';
+      io->flush();
     }
 
     std::vector<std::string> receive() {
       std::string line;
-      std::getline(stream, line);
+      std::getline(*io, line);
+      stopPonder();
       boost::algorithm::trim(line);
 
       std::vector<std::string> packet;
@@ -40,10 +80,13 @@ namespace pokerbots::skeleton {
   public:
     template <typename... Args>
     Runner(boost::asio::ip::tcp::iostream& stream, Args... args)
-      : pokerbot(std::forward<Args>(args)...), stream(stream) {
+      : pokerbot(std::forward<Args>(args)...), stream(stream), io(&stream) {
     }
 
-    ~Runner() { stream.close(); }
+    ~Runner() {
+      stopPonder();
+      stream.close();
+    }
 
     void run() {
       GameInfoPtr gameInfo = std::make_shared<GameInfo>(0, 0.0, 1);
@@ -59,10 +102,21 @@ namespace pokerbots::skeleton {
         for (const auto& clause : packet) {
           auto leftover = clause.substr(1);
           switch (clause[0]) {
+          case 'S': {
+            // the engine moved the connection to shared memory; the ack below goes through it
+            shm = std::make_unique<ShmStream>(leftover, stream.rdbuf()->socket().native_handle());
+            io = shm.get();
+            break;
+          }
           case 'T': {
             gameInfo = std::make_shared<GameInfo>(gameInfo->bankroll, std::stof(leftover), gameInfo->roundNum);
             break;
           }
+          case 'N': {
+            // a resumed match continues from this round
+            gameInfo = std::make_shared<GameInfo>(gameInfo->bankroll, gameInfo->gameClock, std::stoi(leftover));
+            break;
+          }
           case 'P': {
             active = std::stoi(leftover);
             break;
@@ -163,7 +217,8 @@ namespace pokerbots::skeleton {
           }
           }
         }
-        // If roundFlag is true (first message) or roundState is a TerminalState (round is over), send CHECK to ack
+        // If roundFlag is true (first message) or roundState is a TerminalState (round is over), send CHECK to ack.
+        // With "fused", the end of a round arrives with the next round's clauses instead, and is not acked
         if (roundFlag || std::dynamic_pointer_cast<const TerminalState>(roundState)) {
           send(Action{ Action::Type::CHECK });
         } else {
@@ -171,6 +226,7 @@ namespace pokerbots::skeleton {
           auto action = pokerbot.getAction(gameInfo, std::static_pointer_cast<const RoundState>(roundState), active);
           send(action);
         }
+        ponder(gameInfo);
       }
     }
   };
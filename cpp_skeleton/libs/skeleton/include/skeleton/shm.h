@@ -0,0 +1,168 @@
+#pragma once
+
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <cstring>
+#include <iostream>
+#include <streambuf>
+#include <string>
+#include <thread>
+
+#include <fcntl.h>
+#include <poll.h>
+#include <sys/mman.h>
+#include <sys/socket.h>
+#include <unistd.h>
+
+namespace pokerbots::skeleton {
+
+inline constexpr std::size_t SHM_CAPACITY = 1 << 16;  // bytes of data in each direction
+inline constexpr std::size_t SHM_HEADER = 128;  // the write and read counters, each on its own cache line
+inline constexpr auto SHM_SPIN = std::chrono::microseconds(1000);  // time spent spinning before sleeping
+
+/*
+  A stream buffer over the pair of shared-memory ring buffers set up by the engine.
+
+  The engine-to-bot ring comes first, then the bot-to-engine ring. Each ring starts with a
+  write counter and a read counter on separate cache lines, followed by SHM_CAPACITY bytes
+  of data. The socket to the engine stays open only to notice when the engine goes away.
+*/
+class ShmBuf : public std::streambuf {
+private:
+  using Counter = std::atomic<std::uint64_t>;
+  static_assert(Counter::is_always_lock_free, "shared counters must be lock-free");
+
+  char* base = nullptr;
+  std::size_t size = 2 * (SHM_HEADER + SHM_CAPACITY);
+  int socketFd;
+  Counter* recvHead;
+  Counter* recvTail;
+  Counter* sendHead;
+  Counter* sendTail;
+  char* recvData;
+  char* sendData;
+  char inBuffer[4096];
+  char outBuffer[4096];
+
+  // Spins, then sleeps in poll() on the socket; returns false if the engine closed it first.
+  template <typename Ready> bool wait(Ready ready) {
+    auto spinUntil = std::chrono::steady_clock::now() + SHM_SPIN;
+    while (!ready()) {
+      if (std::chrono::steady_clock::now() < spinUntil) {
+        std::this_thread::yield();
+        continue;
+      }
+      pollfd fd = {socketFd, POLLIN, 0};
+      char byte;
+      if (poll(&fd, 1, 1) > 0 && recv(socketFd, &byte, 1, MSG_PEEK | MSG_DONTWAIT) == 0) {
+        return false;
+      }
+    }
+    return true;
+  }
+
+  bool flushOut() {
+    const char* data = pbase();
+    std::size_t length = pptr() - pbase();
+    while (length > 0) {
+      auto head = sendHead->load(std::memory_order_relaxed);
+      auto free = SHM_CAPACITY - (head - sendTail->load(std::memory_order_acquire));
+      if (free == 0) {
+        if (!wait([&] { return sendTail->load(std::memory_order_acquire) + SHM_CAPACITY != head; })) {
+          return false;
+        }
+        continue;
+      }
+      auto start = head % SHM_CAPACITY;
+      auto chunk = std::min({free, length, SHM_CAPACITY - start});
+      std::memcpy(sendData + start, data, chunk);
+      sendHead->store(head + chunk, std::memory_order_release);
+      data += chunk;
+      length -= chunk;
+    }
+    setp(outBuffer, outBuffer + sizeof(outBuffer));
+    return true;
+  }
+
+protected:
+  int_type underflow() override {
+    auto tail = recvTail->load(std::memory_order_relaxed);
+    if (!wait([&] { return recvHead->load(std::memory_order_acquire) != tail; })) {
+      return traits_type::eof();
+    }
+    auto start = tail % SHM_CAPACITY;
+    auto available = recvHead->load(std::memory_order_acquire) - tail;
+    auto chunk = std::min({available, SHM_CAPACITY - start, sizeof(inBuffer)});
+    std::memcpy(inBuffer, recvData + start, chunk);
+    recvTail->store(tail + chunk, std::memory_order_release);
+    setg(inBuffer, inBuffer, inBuffer + chunk);
+    return traits_type::to_int_type(*gptr());
+  }
+
+  int_type overflow(int_type ch) override {
+    if (!flushOut()) {
+      return traits_type::eof();
+    }
+    if (!traits_type::eq_int_type(ch, traits_type::eof())) {
+      *pptr() = traits_type::to_char_type(ch);
+      pbump(1);
+    }
+    return traits_type::not_eof(ch);
+  }
+
+  int sync() override { return flushOut() ? 0 : -1; }
+
+public:
+  ShmBuf(const std::string& path, int socketFd) : socketFd(socketFd) {
+    int fd = open(path.c_str(), O_RDWR);
+    if (fd >= 0) {
+      void* mapped = mmap(nullptr, size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+      close(fd);
+      if (mapped != MAP_FAILED) {
+        base = static_cast<char*>(mapped);
+      }
+    }
+    setg(inBuffer, inBuffer, inBuffer);
+    setp(outBuffer, outBuffer + sizeof(outBuffer));
+    if (base == nullptr) {
+      return;
+    }
+    char* engineRing = base;
+    char* botRing = base + SHM_HEADER + SHM_CAPACITY;
+    recvHead = reinterpret_cast<Counter*>(engineRing);
+    recvTail = reinterpret_cast<Counter*>(engineRing + 64);
+    recvData = engineRing + SHM_HEADER;
+    sendHead = reinterpret_cast<Counter*>(botRing);
+    sendTail = reinterpret_cast<Counter*>(botRing + 64);
+    sendData = botRing + SHM_HEADER;
+  }
+
+  ~ShmBuf() override {
+    if (base != nullptr) {
+      flushOut();
+      munmap(base, size);
+    }
+  }
+
+  bool mapped() const { return base != nullptr; }
+};
+
+/*
+  An iostream over the shared-memory rings, used in place of the TCP stream once the engine offers it.
+*/
+class ShmStream : public std::iostream {
+private:
+  ShmBuf buffer;
+
+public:
+  ShmStream(const std::string& path, int socketFd) : std::iostream(nullptr), buffer(path, socketFd) {
+    rdbuf(&buffer);
+    if (!buffer.mapped()) {
+      setstate(std::ios::badbit);
+    }
+  }
+};
+
+} // namespace pokerbots::skeleton
@@ -0,0 +1,67 @@
+#include "skeleton/preflop.h"
+
+#include <algorithm>
+#include <array>
+#include <fstream>
+#include <iterator>
+#include <stdexcept>
+
+namespace pokerbots::skeleton {
+
+  namespace {
+
+    constexpr int NUM_HANDS = 22100;  // 52 choose 3
+    const std::string RANKS = "23456789TJQKA";
+    const std::string SUITS = "cdhs";
+
+    // the file is little-endian whatever the machine
+    std::uint32_t readUint(const std::vector<unsigned char>& data, std::size_t offset, int bytes) {
+      std::uint32_t value = 0;
+      for (int i = bytes - 1; i >= 0; --i) {
+        value = (value << 8) | data[offset + i];
+      }
+      return value;
+    }
+
+    int handIndex(const std::vector<std::string>& cards) {
+      std::array<int, 3> index;
+      for (int i = 0; i < 3; ++i) {
+        index[i] = 4 * static_cast<int>(RANKS.find(cards[i][0])) + static_cast<int>(SUITS.find(cards[i][1]));
+      }
+      std::sort(index.begin(), index.end());
+      auto [a, b, c] = index;
+      return a + b * (b - 1) / 2 + c * (c - 1) * (c - 2) / 6;
+    }
+
+  } // namespace
+
+  PreflopTable::PreflopTable(const std::string& path) {
+    std::ifstream file(path, std::ios::binary);
+    std::vector<unsigned char> data((std::istreambuf_iterator<char>(file)), std::istreambuf_iterator<char>());
+    if (data.size() < 12 || std::string(data.begin(), data.begin() + 4) != "PFE3") {
+      throw std::runtime_error(path + " is not a preflop equity table");
+    }
+    numClasses = static_cast<int>(readUint(data, 4, 4));
+    samples = static_cast<int>(readUint(data, 8, 4));
+    if (data.size() < 12 + 2 * (NUM_HANDS + 2 * static_cast<std::size_t>(numClasses))) {
+      throw std::runtime_error(path + " is truncated");
+    }
+    classes.resize(NUM_HANDS);
+    for (int i = 0; i < NUM_HANDS; ++i) {
+      classes[i] = static_cast<std::uint16_t>(readUint(data, 12 + 2 * i, 2));
+    }
+    equities.resize(2 * numClasses);
+    for (int i = 0; i < 2 * numClasses; ++i) {
+      equities[i] = static_cast<std::uint16_t>(readUint(data, 12 + 2 * (NUM_HANDS + i), 2));
+    }
+  }
+
+  int PreflopTable::handClass(const std::vector<std::string>& cards) const {
+    return classes[handIndex(cards)];
+  }
+
+  double PreflopTable::equity(const std::vector<std::string>& cards, int active) const {
+    return equities[2 * handClass(cards) + active] / 65535.0;
+  }
+
+} // namespace pokerbots::skeleton
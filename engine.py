@@ -2,31 +2,25 @@
 6.9630 MIT POKERBOTS GAME ENGINE
 DO NOT REMOVE, RENAME, OR EDIT THIS FILE
 '''
-from collections import namedtuple
-from threading import Thread
-from queue import Queue
 import time
-import math
+STARTED = time.perf_counter()  # before the other imports, for the startup report
+from collections import deque
+from threading import Thread, Lock, Event
+from queue import Queue, Full
 import json
 import subprocess
 import socket
+import select
 import pkrbot ###import eval7, but better
 import sys
 import os
 import random
+import itertools
+# modules needed only by optional features (shm, profiling) are imported where they are used
 
 sys.path.append(os.getcwd())
 from config import *
-###New action for discarding a card from your hand and adding it to the board
-DiscardAction = namedtuple('DiscardAction', ['card'])
-
-FoldAction = namedtuple('FoldAction', [])
-CallAction = namedtuple('CallAction', [])
-CheckAction = namedtuple('CheckAction', [])
-# we coalesce BetAction and RaiseAction for convenience
-RaiseAction = namedtuple('RaiseAction', ['amount'])
-
-TerminalState = namedtuple('TerminalState', ['deltas', 'previous_state'])
+from states import FoldAction, CallAction, CheckAction, RaiseAction, DiscardAction, TerminalState, RoundState
 
 STREET_NAMES = ['Flop', 'Discard 1', 'Discard 2', 'Turn', 'River']
 DECODE = {'F': FoldAction, 'C': CallAction, 'K': CheckAction, 'R': RaiseAction, 'D': DiscardAction}
@@ -34,6 +28,12 @@ CCARDS = lambda cards: ','.join(map(str, cards))
 PCARDS = lambda cards: '[{}]'.format(' '.join(map(str, cards))) ### Changed from PCARDS = lambda cards: '[{}]'.format(' '.join(map(str, cards)))
 PVALUE = lambda name, value: ', {} ({})'.format(name, value)
 STATUS = lambda players: ''.join([PVALUE(p.name, p.bankroll) for p in players])
+CARDS = pkrbot.Deck().cards  # the 52 cards, built once rather than per round
+SHM_CAPACITY = 1 << 16  # bytes of data in each direction
+SHM_HEADER = 128  # the write and read counters, each on its own cache line
+SHM_SPIN = 0.001  # seconds a waiting side spins before sleeping
+SHM_SLEEP = 0.0005  # longest sleep between checks once spinning stops
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
 
 # Socket encoding scheme:
 #
@@ -54,183 +54,603 @@ STATUS = lambda players: ''.join([PVALUE(p.name, p.bankroll) for p in players])
 # Messages end with '\n'
 # The engine expects a response of K at the end of the round as an ack,
 # otherwise a response which encodes the player's action
+# A player listing "fused" under "capabilities" is not asked for the ack: the clauses ending
+# a round are sent at the start of its next message instead, or before Q after the last round
 # Action history is sent once, including the player's actions
 
 
-class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks', 'hands', 'deck', 'board', 'previous_state'])):
+# players are built and started from one thread each; a preexec_fn is only safe if no other
+# thread forks at the same time, so subprocesses are started one at a time
+SPAWN_LOCK = Lock()
+
+
+def process_tree(pid):
     '''
-    Encodes the game tree for one round of poker.
+    Returns pid and the pids of all its descendants, read from /proc.
     '''
+    pids = [pid]
+    for parent in pids:
+        try:
+            for task in os.listdir('/proc/{}/task'.format(parent)):
+                with open('/proc/{}/task/{}/children'.format(parent, task), 'r') as children:
+                    pids.extend(int(child) for child in children.read().split())
+        except OSError:
+            pass
+    return pids
 
-    def get_delta(self, winner_index: int) -> int:
-        '''Returns the delta for player A and -delta for player B.
 
-        Args:
-            winner_index (int): Index of the winning player. Must be 0 (player A),
-                1 (player B), or 2 (split pot).
+def cpu_time(root):
+    '''
+    Returns the user plus system CPU seconds used so far by a process and all its descendants, read from /proc.
 
-        Returns:
-            int: The delta value for player A and -delta for player B.
-        '''
-        assert winner_index in [0, 1, 2]
-        delta = 0
-        if winner_index == 2:
-            # Case of split pots
-            assert(self.stacks[0] == self.stacks[1]) # split pots only happen on the river + equal stacks
-            delta = 0
-        else:
-            # Case of one player winning
-            if winner_index == 0:
-                delta = STARTING_STACK - self.stacks[1]
+    The tree is scanned afresh on every call, so helpers started at any time are counted, and each
+    process also counts the children it has already waited for. Only processes that detach
+    from the tree (reparented to init) escape.
+    '''
+    ticks = 0
+    for pid in process_tree(root):
+        try:
+            with open('/proc/{}/stat'.format(pid), 'rb') as stat:
+                # fields after the parenthesised command name, starting with the state
+                fields = stat.read().rsplit(b')', 1)[1].split()
+            # utime and stime, then cutime and cstime of the children it has waited for
+            ticks += int(fields[11]) + int(fields[12]) + int(fields[13]) + int(fields[14])
+        except (OSError, IndexError, ValueError):
+            pass
+    return ticks / CLOCK_TICKS
+
+
+def load_replay(filename):
+    '''
+    Reads a match recorded with EVENT_STREAM into a dict from round number to the recorded round.
+
+    A recorded round's deltas are None unless its result was recorded and its actions replay to it;
+    such rounds are dealt as recorded but played by the bots.
+    '''
+    rounds = {}
+    undealt = set()
+    with open(filename, 'r') as replay_file:
+        for line in replay_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a match that crashed may end with a partial line
+            if record['event'] == 'deal':
+                seats = record['players']
+                rounds[record['round']] = {'seats': seats, 'hands': [record['hands'][name] for name in seats],
+                                           'deck': record['deck'], 'actions': [], 'deltas': None}
+                continue
+            if record['event'] == 'resume':
+                # a resumed match plays the rounds after its checkpoint again
+                for round_num in [round_num for round_num in rounds if round_num >= record['round']]:
+                    del rounds[round_num]
+                continue
+            recorded = rounds.get(record.get('round'))
+            if recorded is None:
+                # the event stream drops events when the consumer falls behind, deals included
+                undealt.add(record.get('round'))
+            elif record['event'] == 'action':
+                recorded['actions'].append(record['action'])
+            elif record['event'] == 'result':
+                recorded['deltas'] = [record['deltas'][name] for name in recorded['seats']]
+                recorded['clocks'] = record['clocks']
+    if undealt:
+        print(filename, 'is missing the deal of', len(undealt), 'rounds - playing them with fresh cards')
+    incomplete = [recorded for recorded in rounds.values() if not replays(recorded)]
+    for recorded in incomplete:
+        recorded['deltas'] = None
+    if incomplete:
+        print(filename, 'is missing actions or results of', len(incomplete), 'rounds - the bots will play them')
+    return rounds
+
+
+def replays(recorded):
+    '''
+    Returns whether a recorded round has a result, and legal actions that reproduce it.
+    '''
+    if recorded['deltas'] is None:
+        return False
+    deck = recorded_deck(recorded['hands'], recorded['deck'])
+    hands = [deck.deal(3), deck.deal(3)]
+    pips = [SMALL_BLIND, BIG_BLIND]
+    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+    round_state = RoundState(0, 0, pips, stacks, hands, deck, [], None)
+    for code in recorded['actions']:
+        if isinstance(round_state, TerminalState) or DECODE.get(code[0]) not in round_state.legal_actions():
+            return False
+        if code[0] == 'R':
+            min_raise, max_raise = round_state.raise_bounds()
+            if not min_raise <= int(code[1:]) <= max_raise:
+                return False
+        action = DECODE[code[0]](int(code[1:])) if len(code) > 1 else DECODE[code[0]]()
+        round_state = round_state.proceed(action)
+    return isinstance(round_state, TerminalState) and round_state.deltas == recorded['deltas']
+
+
+def recorded_deck(hands, board):
+    '''
+    Returns a deck whose top cards reproduce the recorded hands followed by the recorded board cards.
+    '''
+    top = [pkrbot.Card(card) for card in hands[0] + hands[1] + board]
+    return LazyDeck(None, top + [card for card in CARDS if card not in top])
+
+
+class LazyDeck():
+    '''
+    A deck shuffled by a partial Fisher-Yates shuffle, which only draws the cards that are actually dealt.
+    '''
+
+    def __init__(self, rng, cards=None):
+        # with the cards given, the deck is already in order and rng is unused
+        self.rng = rng
+        self.cards = list(CARDS) if cards is None else cards
+        self.drawn = 0 if cards is None else len(cards)  # cards[:drawn] are in their final order
+        self.top = 0  # index of the next card to deal
+
+    def draw(self, n):
+        '''
+        Shuffles the first n cards into their final positions.
+        '''
+        if n <= self.drawn:
+            return
+        cards = self.cards
+        remaining = len(cards)
+        random = self.rng.random
+        for i in range(self.drawn, n):
+            j = i + int(random() * (remaining - i))
+            cards[i], cards[j] = cards[j], cards[i]
+        self.drawn = n
+
+    def deal(self, n):
+        '''
+        Removes the top n cards from the deck and returns them.
+        '''
+        self.draw(self.top + n)
+        self.top += n
+        return self.cards[self.top - n:self.top]
+
+    def peek(self, n):
+        '''
+        Returns the top n cards without altering the deck.
+        '''
+        self.draw(self.top + n)
+        return self.cards[self.top:self.top + n]
+
+    def card(self, i):
+        '''
+        Returns the card i positions below the top without altering the deck.
+        '''
+        self.draw(self.top + i + 1)
+        return self.cards[self.top + i]
+
+
+def allin_equity(hands, board):
+    '''
+    Returns the share of the pot player 0 wins on average over every runout of the remaining board cards.
+    '''
+    known = set(map(str, hands[0] + hands[1] + board))
+    deck = [card for card in CARDS if str(card) not in known]
+    share = 0.
+    runouts = 0
+    for runout in itertools.combinations(deck, 6 - len(board)):
+        cards = board + list(runout)
+        score0 = pkrbot.evaluate(cards + hands[0])
+        score1 = pkrbot.evaluate(cards + hands[1])
+        share += 1. if score0 > score1 else (0.5 if score0 == score1 else 0.)
+        runouts += 1
+    return share / runouts
+
+
+class MatchStats():
+    '''
+    Tracks PLAYER_1's winnings per round to put a confidence interval on who is ahead.
+
+    A round where both players are all in after the discards is also scored at its expected
+    value over every turn and river, rather than the cards that came. That leaves the mean
+    unchanged but removes the luck of the runout from the biggest pots of the match, which
+    narrows the interval and lets STOP_CONFIDENCE end a lopsided match sooner.
+    '''
+
+    def __init__(self):
+        self.confidence = STOP_CONFIDENCE if STOP_CONFIDENCE is not None else 0.95
+        self.z = None  # set on first use, since statistics is slow to import
+        self.rounds = 0
+        self.allin_rounds = 0
+        self.sums = {'raw': [0., 0.], 'adjusted': [0., 0.]}  # sum of deltas and of their squares
+
+    def record(self, players, terminal_state, folded):
+        '''
+        Adds a finished round, given the seat order it was played in and whether it ended in a fold.
+        '''
+        seat = 0 if players[0].name == PLAYER_1_NAME else 1
+        delta = adjusted = terminal_state.deltas[seat]
+        if not folded:
+            allin = None
+            state = terminal_state.previous_state
+            while state is not None:
+                if state.street in (4, 5) and 0 in state.stacks and state.pips[0] == state.pips[1]:
+                    allin = state
+                state = state.previous_state
+            if allin is not None:
+                # the board holds the flop and both discards at street 4, plus the turn at street 5
+                share = allin_equity(allin.hands, allin.board[:allin.street])
+                pot_share = (STARTING_STACK - allin.stacks[0]) * (2 * share - 1)
+                adjusted = pot_share if seat == 0 else -pot_share
+                self.allin_rounds += 1
+        self.rounds += 1
+        for name, value in (('raw', delta), ('adjusted', adjusted)):
+            self.sums[name][0] += value
+            self.sums[name][1] += value * value
+
+    def interval(self, name='adjusted'):
+        '''
+        Returns the mean winnings per round and the half-width of their confidence interval.
+        '''
+        if self.z is None:
+            from statistics import NormalDist
+            self.z = NormalDist().inv_cdf((1 + self.confidence) / 2)
+        if self.rounds < 2:
+            return 0., float('inf')
+        total, squares = self.sums[name]
+        mean = total / self.rounds
+        variance = max(squares - total * mean, 0.) / (self.rounds - 1)
+        return mean, self.z * (variance / self.rounds) ** 0.5
+
+    def decided(self):
+        '''
+        Returns whether the match can stop early, with PLAYER_1 ahead or behind at STOP_CONFIDENCE.
+        '''
+        if STOP_CONFIDENCE is None or self.rounds < STOP_MIN_ROUNDS:
+            return False
+        mean, half_width = self.interval()
+        return abs(mean) > half_width
+
+    def summary(self):
+        '''
+        Returns the game log lines describing PLAYER_1's winnings per round.
+        '''
+        raw = self.interval('raw')
+        adjusted = self.interval()
+        return ['{} won {:.2f} +/- {:.2f} per round at {:g}% confidence over {} rounds'.format(
+                    PLAYER_1_NAME, raw[0], raw[1], 100 * self.confidence, self.rounds),
+                '{} won {:.2f} +/- {:.2f} per round scoring {} all-in rounds at their equity'.format(
+                    PLAYER_1_NAME, adjusted[0], adjusted[1], self.allin_rounds)]
+
+    def state(self):
+        return {'rounds': self.rounds, 'allin_rounds': self.allin_rounds, 'sums': self.sums}
+
+    def load(self, state):
+        self.rounds = state['rounds']
+        self.allin_rounds = state['allin_rounds']
+        self.sums = state['sums']
+
+
+class EventStream():
+    '''
+    Streams structured game events as JSON lines without blocking the game loop.
+    '''
+
+    def __init__(self, target, resume_from=None):
+        self.target = target
+        self.resume_from = resume_from  # the stream's length at the checkpoint being resumed, if any
+        self.queue = Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.dropped = 0
+        self.written = 0  # characters written to a file, all ASCII
+        self.thread = Thread(target=self.drain, daemon=True)
+        self.thread.start()
+
+    def emit(self, event, **fields):
+        '''
+        Queues one event record, dropping it if the writer has fallen behind.
+        '''
+        fields['event'] = event
+        fields['time'] = time.time()
+        try:
+            self.queue.put_nowait(fields)
+        except Full:
+            self.dropped += 1
+
+    def open(self):
+        '''
+        Opens the target: "unix:<path>" connects to a local socket, anything else is a file or FIFO.
+        '''
+        if self.target.startswith('unix:'):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.target[len('unix:'):])
+            return sock.makefile('w')
+        if self.resume_from is not None and os.path.isfile(self.target):
+            # drop the events of rounds played after the checkpoint, which are about to be played again
+            sink = open(self.target, 'r+')
+            sink.seek(min(self.resume_from, os.path.getsize(self.target)))
+            sink.truncate()
+            self.written = sink.tell()
+            return sink
+        # opening a FIFO blocks until a reader appears, which only stalls this thread
+        return open(self.target, 'w' if self.resume_from is None else 'a')
+
+    def offset(self):
+        '''
+        Waits until the events queued so far are written, and returns the length of the stream.
+        '''
+        written = Event()
+        try:
+            self.queue.put(written, timeout=CONNECT_TIMEOUT)
+            written.wait(CONNECT_TIMEOUT)
+        except Full:
+            pass
+        return self.written
+
+    def drain(self):
+        '''
+        Writes queued events to the target until the stream is closed.
+        '''
+        try:
+            with self.open() as sink:
+                while True:
+                    record = self.queue.get()
+                    if record is None:
+                        break
+                    if isinstance(record, Event):
+                        sink.flush()
+                        record.set()
+                        continue
+                    line = json.dumps(record, separators=(',', ':')) + '\n'
+                    sink.write(line)
+                    self.written += len(line)
+                    if self.queue.empty():
+                        sink.flush()
+        except OSError as error:
+            print('Event stream', self.target, 'failed:', error)
+        # keep accepting events so emit never blocks after a failure
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            if isinstance(record, Event):
+                record.set()
             else:
-                delta = self.stacks[0] - STARTING_STACK
+                self.dropped += 1
+
+    def close(self):
+        '''
+        Flushes the remaining events and stops the writer thread.
+        '''
+        try:
+            self.queue.put(None, timeout=CONNECT_TIMEOUT)
+        except Full:
+            pass
+        self.thread.join(CONNECT_TIMEOUT)
+        if self.dropped > 0:
+            print('Event stream dropped', self.dropped, 'events')
 
-        # if delta is not an integer, round it down or up depending on who's in position
-        if abs(delta - math.floor(delta)) > 1e-6:
-            delta = math.floor(delta) if self.button % 2 == 0 else math.ceil(delta)
-        return int(delta)
 
-    def showdown(self) -> TerminalState:
+class OutputCapture():
+    '''
+    Writes a pokerbot's output to its log file as it arrives, up to PLAYER_LOG_SIZE_LIMIT bytes.
+    Output past the limit is dropped, except for the last PLAYER_LOG_TAIL_LINES lines.
+    '''
+
+    def __init__(self, filename):
+        self.log_file = open(filename, 'wb')
+        self.bytes_written = 0
+        self.bytes_dropped = 0
+        self.tail = deque(maxlen=PLAYER_LOG_TAIL_LINES)
+        self.lock = Lock()
+
+    def write(self, output):
         '''
-        Compares the players' hands and computes the final payoffs at showdown.
+        Records one chunk of output; None (no output) is ignored.
+        '''
+        if not output:
+            return
+        with self.lock:
+            if self.log_file.closed:
+                return
+            room = PLAYER_LOG_SIZE_LIMIT - self.bytes_written
+            if room > 0:
+                self.bytes_written += self.log_file.write(output[:room])
+                output = output[room:]
+            if output:
+                self.bytes_dropped += len(output)
+                self.tail.append(output)
 
-        Evaluates both players' hands (hole cards + community cards) and determines
-        the winner. The payoff (delta) is calculated based on:
-        - The winner of the hand
-        - The current pot size
+    def close(self):
+        '''
+        Appends the tail of any dropped output and closes the log file.
+        '''
+        with self.lock:
+            if self.log_file.closed:
+                return
+            if self.bytes_dropped > 0:
+                tail = b''.join(self.tail)
+                marker = '\n[{} bytes over the log size limit dropped, last {} shown]\n'
+                self.log_file.write(marker.format(self.bytes_dropped, len(tail)).encode())
+                self.log_file.write(tail)
+            self.log_file.close()
 
-        Returns:
-            TerminalState: A terminal state object containing:
-                - List of deltas (positive for winner, negative for loser)
-                - Reference to the previous game state
-        
-        Note:
-            This method assumes both players have equal stacks when reaching showdown,
-            which is enforced by an assertion.
-        '''
-        score0 = pkrbot.evaluate(self.board + self.hands[0])
-        score1 = pkrbot.evaluate(self.board + self.hands[1])
-        assert(self.stacks[0] == self.stacks[1])
-        if score0 > score1:
-            delta = self.get_delta(0)
-        elif score0 < score1:
-            delta = self.get_delta(1)
-        else:
-            # split the pot
-            delta = self.get_delta(2)
-        
-        return TerminalState([int(delta), -int(delta)], self)
-
-    def legal_actions(self):
-        '''
-        Returns a set which corresponds to the active player's legal moves.
-        '''
-        active = self.button % 2
-        continue_cost = self.pips[1-active] - self.pips[active]
-        if self.street in (2, 3):
-            return {DiscardAction} if active != self.street % 2 else {CheckAction}
-        if continue_cost == 0:
-            # we can only raise the stakes if both players can afford it
-            bets_forbidden = (self.stacks[0] == 0 or self.stacks[1] == 0)
-            return {CheckAction, FoldAction} if bets_forbidden else {CheckAction, RaiseAction, FoldAction}
-        # continue_cost > 0
-        # similarly, re-raising is only allowed if both players can afford it
-        raises_forbidden = (continue_cost == self.stacks[active] or self.stacks[1-active] == 0)
-        return {FoldAction, CallAction} if raises_forbidden else {FoldAction, CallAction, RaiseAction}
-
-    def raise_bounds(self):
-        '''
-        Returns a tuple of the minimum and maximum legal raises.
-        '''
-        active = self.button % 2
-        continue_cost = self.pips[1-active] - self.pips[active]
-        max_contribution = min(self.stacks[active], self.stacks[1-active] + continue_cost)
-        min_contribution = min(max_contribution, continue_cost + max(continue_cost, BIG_BLIND))
-        return (self.pips[active] + min_contribution, self.pips[active] + max_contribution)
-
-    def proceed_street(self):
-        '''
-        Resets the players' pips and advances the game tree to the next round of betting and updates the board state.
-
-        possible streets: 0, 2, 3, 4, 5, 6
-        '''
-        ### Put the board as peek deck of the street number and make sure board includes this peek + the players discarded cards after state
-        if self.street == 6:
-            return self.showdown()
-        elif self.street == 0:
-            new_street = 2
-            button = 1 ### Player B discards first, since they are out of position
-            self.board.extend(self.deck.peek(new_street))
-        elif self.street == 2:
-            new_street = 3
-            button = 0 ### Player A discards second
-        elif self.street == 3:
-            new_street = 4
-            button = 1 ### Player B acts first after the discard phase
-        else:
-            new_street = self.street + 1
-            button = 1
-            self.board.append(self.deck.peek(new_street - 1)[new_street - 2])
 
-        return RoundState(button, new_street, [0, 0], self.stacks, self.hands, self.deck, self.board, self)
+class SocketChannel():
+    '''
+    A file-like connection to one pokerbot over its TCP socket.
+
+    Unlike socket.makefile, readline bounds the whole line by a deadline: it sleeps in select()
+    for at most the time left, however the pokerbot splits its reply, and raises socket.timeout
+    once the deadline passes.
+    '''
 
-    def proceed(self, action):
+    def __init__(self, sock):
+        self.sock = sock
+        self.outgoing = []
+        self.incoming = bytearray()
+
+    def settimeout(self, timeout):
+        '''
+        Sets how long writes, and reads without a deadline, may wait in seconds; None waits forever.
         '''
-        Advances the game tree by one action performed by the active player.
+        self.sock.settimeout(timeout)
 
-        Args:
-            action: The action being performed. Must be one of:
-                - DiscardAction: Player discards a card from their hand and adds it to the board
-                - FoldAction: Player forfeits the hand
-                - CallAction: Player matches the current bet
-                - CheckAction: Player passes when no bet to match
-                - RaiseAction: Player increases the current bet
+    def write(self, text):
+        '''
+        Buffers text until the next flush.
+        '''
+        self.outgoing.append(text)
 
-        Returns:
-            Either:
-            - RoundState: The new state after the action is performed
-            - TerminalState: If the action ends the hand (e.g., fold or final call)
-
-        Note:
-            The button value is incremented after each action to track whose turn it is.
-            For DiscardAction, the card is added to the board and the hand is updated. Also, advances to the next street.
-            For FoldAction, the inactive player is awarded the pot.
-            For CallAction on button 0, both players post blinds.
-            For CheckAction, advances to next street if both players have acted.
-            For RaiseAction, updates pips and stacks based on raise amount.
-        '''
-        active = self.button % 2
-        if isinstance(action, DiscardAction):
-            if len(self.hands[active]) != 0:
-                self.board.append(self.hands[active].pop(action.card))
-            state = RoundState((1 - active) % 2, self.street, self.pips, self.stacks, self.hands, self.deck, self.board, self)
-            return state
-        if isinstance(action, FoldAction):
-            delta = self.get_delta((1 - active) % 2) # if active folds, the other player (1 - active) wins
-            return TerminalState([delta, -delta], self)
-        if isinstance(action, CallAction):
-            if self.button == 0:  # sb calls bb
-                return RoundState(1, 0, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2, self.hands, self.deck, self.board,self)
-            # both players acted
-            new_pips = list(self.pips)
-            new_stacks = list(self.stacks)
-            contribution = new_pips[1-active] - new_pips[active]
-            new_stacks[active] -= contribution
-            new_pips[active] += contribution
-            state = RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, self.board, self)
-            return state.proceed_street()
-        if isinstance(action, CheckAction):
-            if (self.street == 0 and self.button > 0) or self.button > 1 or self.street == 2 or self.street == 3:  # both players acted
-                return self.proceed_street()
-            # let opponent act
-            return RoundState(self.button + 1, self.street, self.pips, self.stacks, self.hands, self.deck, self.board, self)
-        # isinstance(action, RaiseAction)
-        new_pips = list(self.pips)
-        new_stacks = list(self.stacks)
-        contribution = action.amount - new_pips[active]
-        new_stacks[active] -= contribution
-        new_pips[active] += contribution
-        return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, self.board, self)
+    def flush(self):
+        '''
+        Sends the buffered text.
+        '''
+        data = ''.join(self.outgoing).encode()
+        self.outgoing = []
+        self.sock.sendall(data)
+
+    def readline(self, deadline=None):
+        '''
+        Returns the next line from the pokerbot, including its newline, waiting until the deadline
+        on the time.perf_counter() clock, or for the timeout if there is none.
+        '''
+        if deadline is None and self.sock.gettimeout() is not None:
+            deadline = time.perf_counter() + self.sock.gettimeout()
+        while True:
+            end = self.incoming.find(b'\n')
+            if end >= 0:
+                line = self.incoming[:end + 1]
+                del self.incoming[:end + 1]
+                return line.decode(errors='replace')
+            timeout = None if deadline is None else deadline - time.perf_counter()
+            if timeout is not None and timeout <= 0:
+                raise socket.timeout
+            if not select.select([self.sock], [], [], timeout)[0]:
+                raise socket.timeout
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionResetError
+            self.incoming += data
+
+    def close(self):
+        '''
+        Sends any buffered text and closes the socket.
+        '''
+        try:
+            self.flush()
+        finally:
+            self.sock.close()
+
+
+class ShmChannel():
+    '''
+    A file-like connection to one pokerbot over a pair of shared-memory ring buffers.
+
+    The engine-to-bot ring comes first, then the bot-to-engine ring. Each ring starts with a write
+    counter and a read counter on separate cache lines, followed by SHM_CAPACITY bytes of data;
+    only the writer advances the write counter and only the reader advances the read counter.
+    A waiting side spins for SHM_SPIN seconds, then sleeps in select() on the TCP socket, which
+    stays open only to notice a disconnect.
+    '''
+
+    def __init__(self, path, sock):
+        self.sock = sock
+        self.timeout = None
+        self.outgoing = []
+        self.incoming = bytearray()
+        import mmap
+        size = 2 * (SHM_HEADER + SHM_CAPACITY)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            os.ftruncate(fd, size)
+            self.buffer = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        view = memoryview(self.buffer)
+        offset = SHM_HEADER + SHM_CAPACITY
+        self.send_counters = view[:SHM_HEADER].cast('Q')  # [0] is written, [8] is read
+        self.send_data = view[SHM_HEADER:offset]
+        self.recv_counters = view[offset:offset + SHM_HEADER].cast('Q')
+        self.recv_data = view[offset + SHM_HEADER:]
+        self.views = [self.send_counters, self.send_data, self.recv_counters, self.recv_data, view]
+
+    def settimeout(self, timeout):
+        '''
+        Sets how long reads and writes may wait, in seconds; None waits forever.
+        '''
+        self.timeout = timeout
+
+    def wait(self, ready, deadline):
+        '''
+        Waits until ready() is true, raising socket.timeout at the deadline and
+        ConnectionResetError if the pokerbot closes its socket.
+        '''
+        spin_until = time.perf_counter() + SHM_SPIN
+        while not ready():
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                raise socket.timeout
+            if now < spin_until:
+                os.sched_yield()
+                continue
+            timeout = SHM_SLEEP if deadline is None else min(SHM_SLEEP, deadline - now)
+            if select.select([self.sock], [], [], timeout)[0] and not self.sock.recv(1, socket.MSG_PEEK):
+                raise ConnectionResetError
+
+    def write(self, text):
+        '''
+        Buffers text until the next flush.
+        '''
+        self.outgoing.append(text)
+
+    def flush(self):
+        '''
+        Copies the buffered text into the engine-to-bot ring, waiting while it is full.
+        '''
+        data = ''.join(self.outgoing).encode()
+        self.outgoing = []
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        counters = self.send_counters
+        sent = 0
+        while sent < len(data):
+            head = counters[0]
+            free = SHM_CAPACITY - (head - counters[8])
+            if free == 0:
+                self.wait(lambda: counters[8] + SHM_CAPACITY != head, deadline)
+                continue
+            start = head % SHM_CAPACITY
+            size = min(free, len(data) - sent, SHM_CAPACITY - start)
+            self.send_data[start:start + size] = data[sent:sent + size]
+            counters[0] = head + size  # publish only after the data is in place
+            sent += size
+
+    def readline(self, deadline=None):
+        '''
+        Returns the next line from the bot-to-engine ring, including its newline, waiting until
+        the deadline on the time.perf_counter() clock, or for the timeout if there is none.
+        '''
+        if deadline is None and self.timeout is not None:
+            deadline = time.perf_counter() + self.timeout
+        counters = self.recv_counters
+        while True:
+            end = self.incoming.find(b'\n')
+            if end >= 0:
+                line = self.incoming[:end + 1]
+                del self.incoming[:end + 1]
+                return line.decode(errors='replace')
+            tail = counters[8]
+            if counters[0] == tail:
+                self.wait(lambda: counters[0] != tail, deadline)
+            start = tail % SHM_CAPACITY
+            size = min(counters[0] - tail, SHM_CAPACITY - start)
+            self.incoming += self.recv_data[start:start + size]
+            counters[8] = tail + size
+
+    def close(self):
+        '''
+        Flushes any buffered text and unmaps the rings.
+        '''
+        try:
+            self.flush()
+        finally:
+            for view in self.views:
+                view.release()
+            self.buffer.close()
+            self.sock.close()
 
 
 class Player():
@@ -238,15 +658,76 @@ class Player():
     Handles subprocess and socket interactions with one player's pokerbot.
     '''
 
-    def __init__(self, name, path):
+    def __init__(self, name, path, cpus=None):
         self.name = name
         self.path = path
+        self.cpus = cpus
         self.game_clock = STARTING_GAME_CLOCK
         self.bankroll = 0
         self.commands = None
+        # optional protocol features the pokerbot declares in commands.json, e.g. "batch"
+        self.capabilities = set()
         self.bot_subprocess = None
         self.socketfile = None
-        self.bytes_queue = Queue()
+        self.capture = OutputCapture(self.name + '.txt')
+        self.capture_thread = None
+        self.profile_path = None
+        self.last_latency = 0.
+        self.resumed_round = None  # the round a resumed match starts from, sent once with the next message
+        # the process whose tree's CPU time is measured, or None where /proc is unavailable
+        self.bot_pid = None
+        self.cpu_start = 0.  # CPU seconds the pokerbot had used when it connected
+        self.time_used = {'wall': 0., 'response': 0.}
+
+    def preexec(self, limited=True):
+        '''
+        Returns the preexec_fn for the pokerbot's subprocesses, or None when no isolation is configured.
+        Without limited, it only pins the CPUs, since limits sized for the bot can break its build.
+
+        The preexec_fn runs in the forked child before exec, while other engine threads may hold
+        locks, so everything it needs is looked up here in the parent and it only makes system calls.
+        '''
+        memory_limit = PLAYER_MEMORY_LIMIT if limited else None
+        cpu_time_limit = PLAYER_CPU_TIME_LIMIT if limited else None
+        if self.cpus is None and memory_limit is None and cpu_time_limit is None:
+            return None
+        if os.name != 'posix' or (self.cpus is not None and not hasattr(os, 'sched_setaffinity')):
+            print(self.name, 'CPU pinning and resource limits are unsupported on this platform')
+            return None
+        import resource
+        cpus = self.cpus
+        limits = [(limit, value) for limit, value in ((resource.RLIMIT_AS, memory_limit),
+                                                      (resource.RLIMIT_CPU, cpu_time_limit))
+                  if value is not None]
+        setrlimit = resource.setrlimit
+        sched_setaffinity = os.sched_setaffinity if cpus is not None else None
+
+        def isolate():
+            # pins the child to its CPUs and applies the resource limits
+            if cpus is not None:
+                sched_setaffinity(0, cpus)
+            for limit, value in limits:
+                setrlimit(limit, (value, value))
+        return isolate
+
+    def profiled(self, command):
+        '''
+        Wraps a run command so the pokerbot starts under the profiler matching its language.
+        '''
+        program = os.path.basename(command[0])
+        if program.startswith('python'):
+            self.profile_path = os.path.abspath(self.name + '.prof')
+            return command[:1] + ['-m', 'cProfile', '-o', self.profile_path] + command[1:]
+        if program == 'java':
+            self.profile_path = os.path.abspath(self.name + '.jfr')
+            recording = '-XX:StartFlightRecording=filename={},settings=profile,dumponexit=true'
+            return command[:1] + [recording.format(self.profile_path)] + command[1:]
+        import shutil
+        if shutil.which('perf') is None:
+            print(self.name, 'not profiled - perf not found')
+            return command
+        self.profile_path = os.path.abspath(self.name + '.perf.data')
+        return ['perf', 'record', '--call-graph', 'fp', '-o', self.profile_path, '--'] + command
 
     def build(self):
         '''
@@ -259,6 +740,7 @@ class Player():
                     isinstance(commands['build'], list) and
                     isinstance(commands['run'], list)):
                 self.commands = commands
+                self.capabilities = set(commands.get('capabilities', []))
             else:
                 print(self.name, 'commands.json missing command')
         except FileNotFoundError:
@@ -266,16 +748,23 @@ class Player():
         except json.decoder.JSONDecodeError:
             print(self.name, 'commands.json misformatted')
         if self.commands is not None and len(self.commands['build']) > 0:
+            env = None
+            if PROFILE_PLAYERS:
+                # keep frame pointers and symbols so perf can unwind native bots
+                env = dict(os.environ, CFLAGS='-g -fno-omit-frame-pointer', CXXFLAGS='-g -fno-omit-frame-pointer')
             try:
-                proc = subprocess.run(self.commands['build'],
-                                      stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                      cwd=self.path, timeout=BUILD_TIMEOUT, check=False)
-                self.bytes_queue.put(proc.stdout)
-            except subprocess.TimeoutExpired as timeout_expired:
-                error_message = 'Timed out waiting for ' + self.name + ' to build'
-                print(error_message)
-                self.bytes_queue.put(timeout_expired.stdout)
-                self.bytes_queue.put(error_message.encode())
+                with SPAWN_LOCK:
+                    proc = subprocess.Popen(self.commands['build'],
+                                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                            cwd=self.path, env=env, preexec_fn=self.preexec(limited=False))
+                try:
+                    self.capture.write(proc.communicate(timeout=BUILD_TIMEOUT)[0])
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    error_message = 'Timed out waiting for ' + self.name + ' to build'
+                    print(error_message)
+                    self.capture.write(proc.communicate()[0])
+                    self.capture.write(error_message.encode())
             except (TypeError, ValueError):
                 print(self.name, 'build command misformatted')
             except OSError:
@@ -293,32 +782,43 @@ class Player():
                     server_socket.settimeout(CONNECT_TIMEOUT)
                     server_socket.listen()
                     port = server_socket.getsockname()[1]
-                    proc = subprocess.Popen(self.commands['run'] + [str(port)],
-                                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                            cwd=self.path)
+                    command = self.commands['run'] + [str(port)]
+                    if PROFILE_PLAYERS:
+                        command = self.profiled(command)
+                    with SPAWN_LOCK:
+                        proc = subprocess.Popen(command,
+                                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                cwd=self.path, preexec_fn=self.preexec())
                     self.bot_subprocess = proc
                     # function for bot listening
-                    def enqueue_output(out, queue):
+                    def capture_output(out, capture):
                         try:
-                            for line in out:
+                            # bounded reads, so a bot printing without newlines cannot grow one huge line
+                            for line in iter(lambda: out.readline(PLAYER_LOG_LINE_LIMIT), b''):
                                 if self.path == r"./player_chatbot":
                                     print(line.strip().decode("utf-8"))
                                 else:
-                                    queue.put(line)
+                                    capture.write(line)
                         except ValueError:
                             pass
                     # start a separate bot listening thread which dies with the program
-                    Thread(target=enqueue_output, args=(proc.stdout, self.bytes_queue), daemon=True).start()
+                    self.capture_thread = Thread(target=capture_output, args=(proc.stdout, self.capture), daemon=True)
+                    self.capture_thread.start()
                     # block until we timeout or the player connects
                     client_socket, _ = server_socket.accept()
-                    with client_socket:
-                        if self.path == r"./player_chatbot":
-                            client_socket.settimeout(PLAYER_TIMEOUT)
-                        else:
-                            client_socket.settimeout(CONNECT_TIMEOUT)
-                        sock = client_socket.makefile('rw')
-                        self.socketfile = sock
-                        print(self.name, 'connected successfully')
+                    if self.path == r"./player_chatbot":
+                        client_socket.settimeout(PLAYER_TIMEOUT)
+                    else:
+                        client_socket.settimeout(CONNECT_TIMEOUT)
+                    self.socketfile = SocketChannel(client_socket)
+                    if TRANSPORT == 'shm':
+                        self.attach_shm(client_socket)
+                    print(self.name, 'connected successfully')
+                    if os.path.exists('/proc/{}/stat'.format(proc.pid)):
+                        self.bot_pid = proc.pid
+                        self.cpu_start = cpu_time(self.bot_pid)
+                    elif GAME_CLOCK_MODE == 'cpu':
+                        print(self.name, 'CPU time unavailable - charging response time instead')
             except (TypeError, ValueError):
                 print(self.name, 'run command misformatted')
             except OSError:
@@ -326,13 +826,56 @@ class Player():
             except socket.timeout:
                 print('Timed out waiting for', self.name, 'to connect')
 
-    def stop(self):
+    def attach_shm(self, client_socket):
         '''
-        Closes the socket connection and stops the pokerbot.
+        Moves the connection onto shared-memory ring buffers if the pokerbot supports them.
+
+        The engine sends S<path> over the socket and the pokerbot acks through the rings,
+        after which the socket only carries the disconnect.
+        '''
+        if 'shm' not in self.capabilities:
+            print(self.name, 'does not list "shm" under "capabilities" - using TCP')
+            return
+        import platform
+        import tempfile
+        if platform.machine().lower() not in ('x86_64', 'amd64'):
+            # the Python side of the rings relies on x86-64 keeping stores in order
+            print(self.name, 'shared memory transport needs x86-64 - using TCP')
+            return
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        path = os.path.join(directory, 'pokerbots-{}-{}.shm'.format(os.getpid(), self.name))
+        sock = client_socket.dup()
+        channel = None
+        try:
+            channel = ShmChannel(path, sock)
+            channel.settimeout(client_socket.gettimeout())
+            self.socketfile.write('S' + path + '\n')
+            self.socketfile.flush()
+            if channel.readline().strip() != 'K':
+                raise ConnectionResetError
+            self.socketfile.close()
+            self.socketfile = channel
+        except (socket.timeout, OSError):
+            if channel is None:
+                # nothing was sent yet, so the pokerbot is still on TCP
+                print(self.name, 'could not create the shared memory rings - using TCP')
+                sock.close()
+            else:
+                print(self.name, 'could not attach the shared memory transport')
+                channel.close()
+                self.socketfile.close()
+                self.socketfile = None
+        finally:
+            if os.path.exists(path):
+                os.remove(path)  # both sides have it mapped by now, if they ever will
+
+    def stop(self, clauses=()):
+        '''
+        Sends any clauses still held back along with Q, closes the socket connection and stops the pokerbot.
         '''
         if self.socketfile is not None:
             try:
-                self.socketfile.write('Q\n')
+                self.socketfile.write(' '.join(list(clauses) + ['Q']) + '\n')
                 self.socketfile.close()
             except socket.timeout:
                 print('Timed out waiting for', self.name, 'to disconnect')
@@ -341,24 +884,28 @@ class Player():
         if self.bot_subprocess is not None:
             try:
                 if self.path == r"./player_chatbot":
-                    outs, _ = self.bot_subprocess.communicate(timeout=PLAYER_TIMEOUT)
+                    self.bot_subprocess.wait(timeout=PLAYER_TIMEOUT)
                 else:
-                    outs, _ = self.bot_subprocess.communicate(timeout=CONNECT_TIMEOUT)
-                self.bytes_queue.put(outs)
+                    self.bot_subprocess.wait(timeout=CONNECT_TIMEOUT)
             except subprocess.TimeoutExpired:
                 print('Timed out waiting for', self.name, 'to quit')
-                self.bot_subprocess.kill()
-                outs, _ = self.bot_subprocess.communicate()
-                self.bytes_queue.put(outs)
-        with open(self.name + '.txt', 'wb') as log_file:
-            bytes_written = 0
-            for output in self.bytes_queue.queue:
-                try:
-                    bytes_written += log_file.write(output)
-                    if bytes_written >= PLAYER_LOG_SIZE_LIMIT:
-                        break
-                except TypeError:
-                    pass
+                if self.profile_path is not None:
+                    # the profilers only write their output on an orderly exit, which SIGINT still gives
+                    import signal
+                    self.bot_subprocess.send_signal(signal.SIGINT)
+                    try:
+                        self.bot_subprocess.wait(timeout=CONNECT_TIMEOUT)
+                    except subprocess.TimeoutExpired:
+                        pass
+                if self.bot_subprocess.poll() is None:
+                    self.bot_subprocess.kill()
+                    self.bot_subprocess.wait()
+        if self.capture_thread is not None:
+            # the pipe closes once the bot exits; wait for the listening thread to drain it
+            self.capture_thread.join(CONNECT_TIMEOUT)
+        self.capture.close()
+        if self.profile_path is not None and os.path.exists(self.profile_path):
+            print('Writing', os.path.basename(self.profile_path))
 
     def query(self, round_state, player_message, game_log):
         '''
@@ -386,106 +933,309 @@ class Player():
             - Bot disconnections or timeouts result in game clock being set to 0
             - At the end of a round, only CheckAction is considered legal
         '''
-        legal_actions = round_state.legal_actions() if isinstance(round_state, RoundState) else {CheckAction}
+        self.last_latency = 0.
         if self.socketfile is not None and self.game_clock > 0.:
-            clause = ''
-            try:
-                player_message[0] = 'T{:.3f}'.format(self.game_clock)
-                message = ' '.join(player_message) + '\n'
-                del player_message[1:]  # do not send redundant action history
-                start_time = time.perf_counter()
-                self.socketfile.write(message)
-                self.socketfile.flush()
-                clause = self.socketfile.readline().strip()
-                end_time = time.perf_counter()
-                if ENFORCE_GAME_CLOCK and self.path != r"./player_chatbot":
-                    self.game_clock -= end_time - start_time
-                if self.game_clock <= 0.:
-                    raise socket.timeout
-                action = DECODE[clause[0]]
-                if action in legal_actions:
-                    if clause[0] == 'R':
-                        amount = int(clause[1:])
-                        min_raise, max_raise = round_state.raise_bounds()
-                        if min_raise <= amount <= max_raise:
-                            return action(amount)
-                    elif clause[0] == 'D':
-                        card = int(clause[1:])
-                        if 0 <= card <= 2:
-                            return action(card)
-                        else:
-                            game_log.append(f"{self.name} attempted to discard invalid index {card}")
-                            # Invalid index - fall through to default action handling
-                        ###### index the player's hand 'D0', 'D1', or 'D2' ######
+            message = ' '.join(self.header() + player_message[1:]) + '\n'
+            del player_message[1:]  # do not send redundant action history
+            clause = self.exchange(message, game_log)
+            if clause is not None:
+                return self.decode(clause, round_state, game_log)
+        return self.default_action(round_state)
+
+    def query_batch(self, requests, game_log):
+        '''
+        Requests one action per table from the pokerbot in a single round trip.
+
+        requests is a list of (table, round_state, player_message) tuples. The message carries the
+        game clock once, then a #<table> clause before each table's clauses; the pokerbot answers
+        with one space-separated action per table, in the same order. Errors are logged to each
+        table's own log, falling back to the default action for that table only.
+        '''
+        self.last_latency = 0.
+        if self.socketfile is not None and self.game_clock > 0.:
+            clauses = self.header()
+            for table, _, player_message in requests:
+                clauses.append('#' + str(table.index))
+                clauses.extend(player_message[1:])
+                del player_message[1:]
+            response = self.exchange(' '.join(clauses) + '\n', game_log)
+            if response is not None:
+                responses = response.split(' ')
+                if len(responses) == len(requests):
+                    return [self.decode(clause, round_state, table.log)
+                            for clause, (table, round_state, _) in zip(responses, requests)]
+                game_log.append(self.name + ' response misformatted: ' + response)
+        return [self.default_action(round_state) for _, round_state, _ in requests]
+
+    def header(self):
+        '''
+        Returns the clauses that open each message: the game clock, and once after a resume, the round number.
+        '''
+        clauses = ['T{:.3f}'.format(self.game_clock)]
+        if self.resumed_round is not None:
+            clauses.append('N' + str(self.resumed_round))
+            self.resumed_round = None
+        return clauses
+
+    def exchange(self, message, game_log):
+        '''
+        Sends one message and reads the reply, charging the game clock for the round trip.
+
+        Returns the stripped reply, or None if the pokerbot ran out of time or disconnected.
+        '''
+        try:
+            # /proc is only read per query when CPU time is what gets charged
+            sample_cpu = GAME_CLOCK_MODE == 'cpu' and self.bot_pid is not None
+            cpu_start = cpu_time(self.bot_pid) if sample_cpu else 0.
+            start_time = time.perf_counter()
+            self.socketfile.write(message)
+            self.socketfile.flush()
+            sent_time = time.perf_counter()
+            response = self.socketfile.readline(self.deadline(start_time, sent_time)).strip()
+            end_time = time.perf_counter()
+            cpu_end = cpu_time(self.bot_pid) if sample_cpu else 0.
+            self.last_latency = end_time - start_time
+            elapsed = {'wall': end_time - start_time, 'response': end_time - sent_time, 'cpu': cpu_end - cpu_start}
+            for mode in self.time_used:
+                self.time_used[mode] += elapsed[mode]
+            if GAME_CLOCK_MODE == 'cpu' and self.bot_pid is None:
+                charged = elapsed['response']
+            else:
+                charged = elapsed[GAME_CLOCK_MODE]
+            if ENFORCE_GAME_CLOCK and self.path != r"./player_chatbot":
+                self.game_clock -= charged
+            if self.game_clock <= 0.:
+                raise socket.timeout
+            return response
+        except socket.timeout:
+            error_message = self.name + ' ran out of time'
+            if self.profile_path is not None:
+                error_message += ' - see ' + os.path.basename(self.profile_path)
+            game_log.append(error_message)
+            print(error_message)
+            self.game_clock = 0.
+        except OSError:
+            error_message = self.name + ' disconnected'
+            game_log.append(error_message)
+            print(error_message)
+            self.game_clock = 0.
+        except ValueError:  # including a reply that is not valid UTF-8
+            game_log.append(self.name + ' response misformatted')
+        return None
+
+    def cpu_used(self):
+        '''
+        Returns the CPU seconds the pokerbot has used since it connected, from one reading of /proc,
+        or 0 where /proc is unavailable. This includes any work done between queries.
+        '''
+        if self.bot_pid is None:
+            return 0.
+        return cpu_time(self.bot_pid) - self.cpu_start
+
+    def deadline(self, start_time, sent_time):
+        '''
+        Returns when the reply to a query sent at these times must have arrived: once the game
+        clock would run out, and no more than CONNECT_TIMEOUT after sending. CPU time is only known
+        after the reply, so in "cpu" mode the clock is checked then instead.
+        '''
+        if self.path == r"./player_chatbot":
+            return sent_time + PLAYER_TIMEOUT
+        deadline = sent_time + CONNECT_TIMEOUT
+        if ENFORCE_GAME_CLOCK:
+            if GAME_CLOCK_MODE == 'wall':
+                deadline = min(deadline, start_time + self.game_clock)
+            elif GAME_CLOCK_MODE == 'response' or self.bot_pid is None:
+                deadline = min(deadline, sent_time + self.game_clock)
+        return deadline
+
+    def decode(self, clause, round_state, game_log):
+        '''
+        Converts one action clause from the pokerbot into a legal action, or the default action.
+        '''
+        legal_actions = round_state.legal_actions() if isinstance(round_state, RoundState) else {CheckAction}
+        try:
+            action = DECODE[clause[0]]
+            if action in legal_actions:
+                if clause[0] == 'R':
+                    amount = int(clause[1:])
+                    min_raise, max_raise = round_state.raise_bounds()
+                    if min_raise <= amount <= max_raise:
+                        return action(amount)
+                elif clause[0] == 'D':
+                    card = int(clause[1:])
+                    if 0 <= card <= 2:
+                        return action(card)
                     else:
-                        return action()
+                        game_log.append(f"{self.name} attempted to discard invalid index {card}")
+                        # Invalid index - fall through to default action handling
+                    ###### index the player's hand 'D0', 'D1', or 'D2' ######
                 else:
-                    # Action is not in legal_actions
-                    game_log.append(f"street = {round_state.street}")
-                    game_log.append(self.name + ' attempted illegal ' + action.__name__)
-            except socket.timeout:
-                error_message = self.name + ' ran out of time'
-                game_log.append(error_message)
-                print(error_message)
-                self.game_clock = 0.
-            except OSError:
-                error_message = self.name + ' disconnected'
-                game_log.append(error_message)
-                print(error_message)
-                self.game_clock = 0.
-            except (IndexError, KeyError, ValueError):
-                game_log.append(self.name + ' response misformatted: ' + str(clause))
+                    return action()
+            else:
+                # Action is not in legal_actions
+                game_log.append(f"street = {round_state.street}")
+                game_log.append(self.name + ' attempted illegal ' + action.__name__)
+        except (IndexError, KeyError, ValueError):
+            game_log.append(self.name + ' response misformatted: ' + str(clause))
+        return self.default_action(round_state)
+
+    def default_action(self, round_state):
+        '''
+        Returns the action taken for a pokerbot that fails to answer: check if legal, otherwise fold.
+        '''
+        legal_actions = round_state.legal_actions() if isinstance(round_state, RoundState) else {CheckAction}
         return CheckAction() if CheckAction in legal_actions else FoldAction()
 
 
-class Game():
+class Table():
     '''
-    Manages logging and the high-level game procedure.
+    Holds the per-round log and player messages of one table.
+
+    A match normally plays on a single table; with NUM_TABLES > 1 several tables play
+    different rounds at once, each buffering its log until its round is over.
     '''
 
-    def __init__(self):
-        self.log = ['6.9630 MIT Pokerbots - ' + PLAYER_1_NAME + ' vs ' + PLAYER_2_NAME]
+    def __init__(self, index, log):
+        self.index = index
+        self.log = log
+        self.round_num = 0
         self.player_messages = [[], []]
+        self.unsent = {}  # player name -> clauses ending the last round, for players with "fused"
         self.preflop_bets = {PLAYER_1_NAME: 0, PLAYER_2_NAME: 0}
         self.flop_bets = {PLAYER_1_NAME: 0, PLAYER_2_NAME: 0}
         self.turn_bets = {PLAYER_1_NAME: 0, PLAYER_2_NAME: 0}
+
+
+class Game():
+    '''
+    Manages logging and the high-level game procedure.
+    '''
+
+    def __init__(self):
+        self.log = ['6.9630 MIT Pokerbots - ' + PLAYER_1_NAME + ' vs ' + PLAYER_2_NAME]
+        self.table = Table(0, self.log)
+        self.tables = [self.table]
         self.ev_preflop_bets = {PLAYER_1_NAME: 0, PLAYER_2_NAME: 0}
         self.ev_flop_bets = {PLAYER_1_NAME: 0, PLAYER_2_NAME: 0}
         self.ev_turn_bets = {PLAYER_1_NAME: 0, PLAYER_2_NAME: 0}
+        self.stats = MatchStats()
+        self.round_num = 0
+        self.rng = random.Random()
+        self.log_offset = 0
+        self.checkpoint = None
+        if CHECKPOINT_FILENAME is not None and os.path.exists(CHECKPOINT_FILENAME):
+            with open(CHECKPOINT_FILENAME, 'r') as checkpoint_file:
+                self.checkpoint = json.load(checkpoint_file)
+        # load the replay before the event stream can truncate a file of the same name
+        self.replay = load_replay(REPLAY_FILENAME) if REPLAY_FILENAME is not None else {}
+        self.fast_forward_until = REPLAY_FROM_ROUND if REPLAY_FILENAME is not None else 1
+        if EVENT_STREAM is not None:
+            self.events = EventStream(EVENT_STREAM, self.checkpoint['event_offset'] if self.checkpoint else None)
+        else:
+            self.events = None
+
+    def emit(self, event, round_num=None, **fields):
+        '''
+        Sends one record to the event stream, if it is enabled.
+        '''
+        if self.events is not None:
+            self.events.emit(event, round=self.round_num if round_num is None else round_num, **fields)
 
-    def log_round_state(self, players, round_state):
+    def flush_log(self):
+        '''
+        Appends the game log collected so far to the game log file and clears it from memory.
+        '''
+        with open(GAME_LOG_FILENAME + '.txt', 'r+' if self.log_offset else 'w') as log_file:
+            log_file.seek(self.log_offset)
+            log_file.truncate()  # drop anything written after the checkpoint we resumed from
+            log_file.write('\n'.join(self.log) + '\n')
+            self.log_offset = log_file.tell()
+        del self.log[:]  # in place, since the table logs into the same list
+
+    def save_checkpoint(self, players):
+        '''
+        Atomically records everything needed to resume the match after the current round.
+        '''
+        self.flush_log()
+        version, state, gauss = self.rng.getstate()
+        checkpoint = {
+            'round_num': self.round_num,
+            'seats': [player.name for player in players],
+            'bankrolls': {player.name: player.bankroll for player in players},
+            'clocks': {player.name: player.game_clock for player in players},
+            'rng_state': [version, list(state), gauss],
+            'log_offset': self.log_offset,
+            'event_offset': self.events.offset() if self.events is not None else 0,
+            'ev_preflop_bets': self.ev_preflop_bets,
+            'ev_flop_bets': self.ev_flop_bets,
+            'ev_turn_bets': self.ev_turn_bets,
+            'stats': self.stats.state(),
+        }
+        with open(CHECKPOINT_FILENAME + '.tmp', 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(CHECKPOINT_FILENAME + '.tmp', CHECKPOINT_FILENAME)
+
+    def resume(self, players):
+        '''
+        Restores the match state from the loaded checkpoint and returns the players in seat order.
+        '''
+        checkpoint = self.checkpoint
+        print('Resuming from', CHECKPOINT_FILENAME, 'after round', checkpoint['round_num'])
+        if [player.name for player in players] != checkpoint['seats']:
+            players = players[::-1]
+        for player in players:
+            player.bankroll = checkpoint['bankrolls'][player.name]
+            player.game_clock = checkpoint['clocks'][player.name]
+            player.resumed_round = checkpoint['round_num'] + 1
+        version, state, gauss = checkpoint['rng_state']
+        self.rng.setstate((version, tuple(state), gauss))
+        self.log_offset = checkpoint['log_offset']
+        self.ev_preflop_bets = checkpoint['ev_preflop_bets']
+        self.ev_flop_bets = checkpoint['ev_flop_bets']
+        self.ev_turn_bets = checkpoint['ev_turn_bets']
+        self.stats.load(checkpoint['stats'])
+        self.log[:] = ['', 'Resumed after round {}'.format(checkpoint['round_num'])]
+        # a FIFO or socket reader has seen the rounds after the checkpoint already, and must drop them
+        self.emit('resume', checkpoint['round_num'] + 1)
+        return players
+
+    def log_round_state(self, table, players, round_state):
         '''
         Incorporates RoundState information into the game log and player messages.
         '''
         if round_state.street == 0:
-            self.preflop_bets = {players[0].name: STARTING_STACK-round_state.stacks[0],
+            table.preflop_bets = {players[0].name: STARTING_STACK-round_state.stacks[0],
                                      players[1].name: STARTING_STACK-round_state.stacks[1]}
         elif round_state.street == 4:
-            self.flop_bets = {players[0].name: STARTING_STACK-round_state.stacks[0]-self.preflop_bets[players[0].name],
-                                players[1].name: STARTING_STACK-round_state.stacks[1]-self.preflop_bets[players[1].name]}
+            table.flop_bets = {players[0].name: STARTING_STACK-round_state.stacks[0]-table.preflop_bets[players[0].name],
+                                players[1].name: STARTING_STACK-round_state.stacks[1]-table.preflop_bets[players[1].name]}
         else:
-            self.turn_bets = {players[0].name: STARTING_STACK-round_state.stacks[0]-self.flop_bets[players[0].name]-self.preflop_bets[players[0].name],
-                                players[1].name: STARTING_STACK-round_state.stacks[1]-self.flop_bets[players[1].name]-self.preflop_bets[players[1].name]}
+            table.turn_bets = {players[0].name: STARTING_STACK-round_state.stacks[0]-table.flop_bets[players[0].name]-table.preflop_bets[players[0].name],
+                                players[1].name: STARTING_STACK-round_state.stacks[1]-table.flop_bets[players[1].name]-table.preflop_bets[players[1].name]}
             
         
         if round_state.street == 0 and round_state.button == 0:
-            self.log.append('{} posts the blind of {}'.format(players[0].name, SMALL_BLIND))
-            self.log.append('{} posts the blind of {}'.format(players[1].name, BIG_BLIND))
-            self.log.append('{} dealt {}'.format(players[0].name, PCARDS(round_state.hands[0])))
-            self.log.append('{} dealt {}'.format(players[1].name, PCARDS(round_state.hands[1])))
-            self.player_messages[0] = ['T0.', 'P0', 'H' + CCARDS(round_state.hands[0]), 'G']
-            self.player_messages[1] = ['T0.', 'P1', 'H' + CCARDS(round_state.hands[1]), 'G']
+            table.log.append('{} posts the blind of {}'.format(players[0].name, SMALL_BLIND))
+            table.log.append('{} posts the blind of {}'.format(players[1].name, BIG_BLIND))
+            table.log.append('{} dealt {}'.format(players[0].name, PCARDS(round_state.hands[0])))
+            table.log.append('{} dealt {}'.format(players[1].name, PCARDS(round_state.hands[1])))
+            table.player_messages[0] = (['T0.'] + table.unsent.pop(players[0].name, []) +
+                                        ['P0', 'H' + CCARDS(round_state.hands[0]), 'G'])
+            table.player_messages[1] = (['T0.'] + table.unsent.pop(players[1].name, []) +
+                                        ['P1', 'H' + CCARDS(round_state.hands[1]), 'G'])
         elif (round_state.street > 0 and round_state.street != 3 and round_state.button == 1) or (round_state.street == 3 and round_state.button == 0):
             board = round_state.board
-            self.log.append(STREET_NAMES[round_state.street - 2] + ' ' + PCARDS(board) +
+            table.log.append(STREET_NAMES[round_state.street - 2] + ' ' + PCARDS(board) +
                             PVALUE(players[0].name, STARTING_STACK-round_state.stacks[0]) +
                             PVALUE(players[1].name, STARTING_STACK-round_state.stacks[1]))
-            self.log.append(f"Current stacks: {round_state.stacks[0]}, {round_state.stacks[1]}")
+            table.log.append(f"Current stacks: {round_state.stacks[0]}, {round_state.stacks[1]}")
             compressed_board = 'B' + CCARDS(board)
-            self.player_messages[0].append(compressed_board)
-            self.player_messages[1].append(compressed_board)
+            table.player_messages[0].append(compressed_board)
+            table.player_messages[1].append(compressed_board)
+            self.emit('street', table.round_num, street=round_state.street, board=list(map(str, board)),
+                      stacks={players[0].name: round_state.stacks[0], players[1].name: round_state.stacks[1]})
 
-    def log_action(self, name, action, bet_override, hand):
+    def log_action(self, table, name, action, bet_override, hand):
         '''
         Incorporates action information into the game log and player messages.
         '''
@@ -504,53 +1254,244 @@ class Game():
         else:  # isinstance(action, RaiseAction)
             phrasing = (' bets ' if bet_override else ' raises to ') + str(action.amount)
             code = 'R' + str(action.amount)
-        self.log.append(name + phrasing)
-        self.player_messages[0].append(code)
-        self.player_messages[1].append(code)
+        table.log.append(name + phrasing)
+        table.player_messages[0].append(code)
+        table.player_messages[1].append(code)
+        return code
 
-    def log_terminal_state(self, players, round_state):
+    def log_terminal_state(self, table, players, round_state):
         '''
         Incorporates TerminalState information into the game log and player messages.
         '''
         previous_state = round_state.previous_state
-        if not self.log[-1].endswith(' folds'):
-            self.log.append('{} shows {}'.format(players[0].name, PCARDS(previous_state.hands[0])))
-            self.log.append('{} shows {}'.format(players[1].name, PCARDS(previous_state.hands[1])))
-            self.player_messages[0].append('O' + CCARDS(previous_state.hands[1]))
-            self.player_messages[1].append('O' + CCARDS(previous_state.hands[0]))
-        self.log.append('{} awarded {}'.format(players[0].name, round_state.deltas[0]))
-        self.log.append('{} awarded {}'.format(players[1].name, round_state.deltas[1]))
-        self.player_messages[0].append('A' + str(round_state.deltas[0]))
-        self.player_messages[1].append('A' + str(round_state.deltas[1]))
-
-    def run_round(self, players):
-        '''
-        Runs one round of poker.
-        '''
-        deck = pkrbot.Deck()
-        deck.shuffle()
+        if not table.log[-1].endswith(' folds'):
+            table.log.append('{} shows {}'.format(players[0].name, PCARDS(previous_state.hands[0])))
+            table.log.append('{} shows {}'.format(players[1].name, PCARDS(previous_state.hands[1])))
+            table.player_messages[0].append('O' + CCARDS(previous_state.hands[1]))
+            table.player_messages[1].append('O' + CCARDS(previous_state.hands[0]))
+        table.log.append('{} awarded {}'.format(players[0].name, round_state.deltas[0]))
+        table.log.append('{} awarded {}'.format(players[1].name, round_state.deltas[1]))
+        table.player_messages[0].append('A' + str(round_state.deltas[0]))
+        table.player_messages[1].append('A' + str(round_state.deltas[1]))
+
+    def play_round(self, table, players, recorded=None, fast_forward=False):
+        '''
+        Plays one round of poker on a table as a generator.
+
+        Yields (seat, round_state) whenever a player must be queried, and expects the
+        action to be sent back; the acks at the end of the round are yielded the same way,
+        except for players with "fused", whose last clauses wait in table.unsent instead.
+        A recorded round from load_replay fixes the cards dealt. With fast_forward, the recorded
+        actions are also replayed instead of querying the players.
+        '''
+        if recorded is None:
+            deck = LazyDeck(self.rng)
+        else:
+            deck = recorded_deck(recorded['hands'], recorded['deck'])
+        recorded_actions = iter(recorded['actions']) if fast_forward else None
         hands = [deck.deal(3), deck.deal(3)]
         board = []
         pips = [SMALL_BLIND, BIG_BLIND]
         stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
         round_state = RoundState(0, 0, pips, stacks, hands, deck, board, None)
+        if self.events is not None:
+            # recording the board cards draws them early, which only matters when events are on
+            self.emit('deal', table.round_num, players=[player.name for player in players],
+                      hands={player.name: list(map(str, hand)) for player, hand in zip(players, hands)},
+                      deck=list(map(str, deck.peek(5))))
         while not isinstance(round_state, TerminalState):
-            self.log_round_state(players, round_state)
+            self.log_round_state(table, players, round_state)
             active = round_state.button % 2
             player = players[active]
-            action = player.query(round_state, self.player_messages[active], self.log)
+            code = next(recorded_actions, None) if recorded_actions is not None else None
+            if recorded_actions is not None and code is None:
+                print('Round', table.round_num, 'was not recorded in full - handing control to the bots')
+                self.fast_forward_until = 1
+                recorded_actions = None
+            if recorded_actions is None:
+                action = yield active, round_state
+            else:
+                player.last_latency = 0.
+                action = DECODE[code[0]](int(code[1:])) if len(code) > 1 else DECODE[code[0]]()
             bet_override = (round_state.pips == [0, 0])
-            self.log_action(player.name, action, bet_override, round_state.hands[active])
+            code = self.log_action(table, player.name, action, bet_override, round_state.hands[active])
+            self.emit('action', table.round_num, street=round_state.street, player=player.name, action=code,
+                      clock=player.game_clock, latency=player.last_latency)
             round_state = round_state.proceed(action)
-        self.log_terminal_state(players, round_state)
+        self.log_terminal_state(table, players, round_state)
         for i in range(len(players)):
             multiplier = 1 if round_state.deltas[i] > 0 else (0 if round_state.deltas[i] == 0 else -1)
-            self.ev_preflop_bets[players[i].name] += multiplier * self.preflop_bets[players[i].name]
-            self.ev_flop_bets[players[i].name] += multiplier * self.flop_bets[players[i].name]
-            self.ev_turn_bets[players[i].name] += multiplier * self.turn_bets[players[i].name]
-        for player, player_message, delta in zip(players, self.player_messages, round_state.deltas):
-            player.query(round_state, player_message, self.log)
+            self.ev_preflop_bets[players[i].name] += multiplier * table.preflop_bets[players[i].name]
+            self.ev_flop_bets[players[i].name] += multiplier * table.flop_bets[players[i].name]
+            self.ev_turn_bets[players[i].name] += multiplier * table.turn_bets[players[i].name]
+        self.stats.record(players, round_state, isinstance(action, FoldAction))
+        for seat, (player, delta) in enumerate(zip(players, round_state.deltas)):
+            if recorded_actions is None:
+                if 'fused' not in player.capabilities:
+                    yield seat, round_state
+                elif player.socketfile is not None and player.game_clock > 0.:
+                    # no ack: the rest of this round goes out with the player's next message
+                    table.unsent[player.name] = table.player_messages[seat][1:]
             player.bankroll += delta
+        if recorded_actions is not None:
+            if round_state.deltas != recorded['deltas']:
+                print('Round', table.round_num, 'replayed to', round_state.deltas, 'instead of', recorded['deltas'])
+            for player in players:
+                player.game_clock = recorded['clocks'].get(player.name, player.game_clock)
+        self.emit('result', table.round_num, street=round_state.previous_state.street,
+                  deltas={player.name: delta for player, delta in zip(players, round_state.deltas)},
+                  bankrolls={player.name: player.bankroll for player in players},
+                  clocks={player.name: player.game_clock for player in players})
+
+    def run_round(self, players, recorded=None, fast_forward=False):
+        '''
+        Runs one round of poker, querying the players one decision at a time.
+        '''
+        table = self.table
+        table.round_num = self.round_num
+        play = self.play_round(table, players, recorded, fast_forward)
+        try:
+            seat, round_state = next(play)
+            while True:
+                action = players[seat].query(round_state, table.player_messages[seat], self.log)
+                seat, round_state = play.send(action)
+        except StopIteration:
+            pass
+
+    def replayed(self, round_num):
+        '''
+        Returns the recorded round to deal, if any, and whether its actions are replayed as well.
+        '''
+        recorded = self.replay.get(round_num)
+        fast_forward = round_num < self.fast_forward_until
+        if fast_forward and (recorded is None or recorded['deltas'] is None):
+            print('Round', round_num, 'was not recorded in full - handing control to the bots')
+            self.fast_forward_until = 1
+            fast_forward = False
+        return recorded, fast_forward
+
+    def run_tables(self, players, first_round):
+        '''
+        Plays rounds first_round to NUM_ROUNDS on NUM_TABLES tables at once, or until the match is decided.
+
+        Each table starts the next unplayed round as soon as its previous one ends, seating the
+        players as the single-table match would for that round number. Every pass queries each
+        player once with the decisions pending for it on all tables. A round's log is added to
+        the game log when the round ends, and checkpoints wait until every table is idle.
+        Returns the players in the seat order of the round after the last one.
+        '''
+        tables = self.tables = [Table(index, []) for index in range(NUM_TABLES)]
+        rounds = {}  # table index -> (seats, generator) of the round in progress
+        pending = {}  # table index -> (player, seat, round_state) awaiting a query
+        waiting = []  # tables held back until the next checkpoint is saved
+        next_round = first_round
+        checkpointed = first_round - 1
+
+        def seats_for(round_num):
+            return players if (round_num - first_round) % 2 == 0 else players[::-1]
+
+        def advance(table, action=None):
+            # resumes the table's round, starting new rounds on it while the previous one has ended
+            nonlocal next_round
+            while True:
+                if table.index in rounds:
+                    seats, play = rounds[table.index]
+                    try:
+                        seat, round_state = play.send(action) if action is not None else next(play)
+                        pending[table.index] = (seats[seat], seat, round_state)
+                        return
+                    except StopIteration:
+                        del rounds[table.index]
+                        self.log.append('')
+                        self.log.extend(table.log)
+                        action = None
+                if next_round > NUM_ROUNDS or self.stats.decided():
+                    return
+                if (CHECKPOINT_FILENAME is not None and (next_round - 1) % CHECKPOINT_INTERVAL == 0 and
+                        next_round - 1 > checkpointed):
+                    waiting.append(table)
+                    return
+                table.round_num = next_round
+                next_round += 1
+                seats = seats_for(table.round_num)
+                table.log = ['Round #' + str(table.round_num) + STATUS(seats)]
+                recorded, fast_forward = self.replayed(table.round_num)
+                rounds[table.index] = (seats, self.play_round(table, seats, recorded, fast_forward))
+
+        for table in tables:
+            advance(table)
+        while pending or waiting:
+            if not pending:
+                # every table is idle at a checkpoint boundary
+                self.round_num = checkpointed = next_round - 1
+                self.save_checkpoint(seats_for(next_round))
+                resumed, waiting[:] = list(waiting), []
+                for table in resumed:
+                    advance(table)
+                continue
+            for player in players:
+                indices = [index for index, (seated, _, _) in pending.items() if seated is player]
+                if not indices:
+                    continue
+                requests = []
+                for index in indices:
+                    _, seat, round_state = pending.pop(index)
+                    requests.append((tables[index], round_state, tables[index].player_messages[seat]))
+                actions = player.query_batch(requests, self.log)
+                for index, action in zip(indices, actions):
+                    advance(tables[index], action)
+        self.round_num = next_round - 1
+        return seats_for(next_round)
+
+    def start_players(self, players, step, by_path=False):
+        '''
+        Calls step(player) for all players at once, one thread each, and returns the total seconds
+        the calls took. With by_path, players sharing a directory take turns, so that two copies of
+        one bot are not built over each other.
+        '''
+        groups = {}
+        for player in players:
+            key = os.path.realpath(player.path) if by_path else id(player)
+            groups.setdefault(key, []).append(player)
+        durations = []
+
+        def run_group(group):
+            for player in group:
+                start = time.perf_counter()
+                step(player)  # build and run handle their own errors, per player
+                durations.append(time.perf_counter() - start)
+
+        threads = [Thread(target=run_group, args=(group,)) for group in groups.values()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(durations)
+
+    def unsent(self, player):
+        '''
+        Returns the clauses still held back for a player with "fused", to send before Q.
+        '''
+        clauses = []
+        for table in self.tables:
+            if player.name in table.unsent:
+                if len(self.tables) > 1:
+                    clauses.append('#' + str(table.index))
+                clauses.extend(table.unsent.pop(player.name))
+        return clauses
+
+    def report_startup(self, started, built, connected, sequential):
+        '''
+        Prints where the time went between loading the engine and the first round, and how much of
+        it starting both bots at once saved over the sequential time of the same steps.
+        '''
+        import states
+        compiled = not states.__file__.endswith('.py')
+        print('Startup: {:.0f} ms loading the engine, {:.0f} ms building, {:.0f} ms connecting '
+              '({:.0f} ms saved by starting the bots together); first round after {:.0f} ms (states.py {})'.format(
+                  1000 * (LOADED - STARTED), 1000 * (built - started), 1000 * (connected - built),
+                  1000 * max(sequential - (connected - started), 0.), 1000 * (connected - STARTED),
+                  'compiled' if compiled else 'not compiled'))
 
     def run(self):
         '''
@@ -562,34 +1503,83 @@ class Game():
         print('/_/  /_/___/ /_/   /_/   \\___/_/\\_\\\\__/_/ /_.__/\\___/\\__/___/')
         print()
         print('Starting the Pokerbots engine...')
+        if ENGINE_CPUS is not None:
+            if hasattr(os, 'sched_setaffinity'):
+                os.sched_setaffinity(0, ENGINE_CPUS)
+            else:
+                print('Engine CPU pinning is unsupported on this platform')
         players = [
-            Player(PLAYER_1_NAME, PLAYER_1_PATH),
-            Player(PLAYER_2_NAME, PLAYER_2_PATH)
+            Player(PLAYER_1_NAME, PLAYER_1_PATH, PLAYER_1_CPUS),
+            Player(PLAYER_2_NAME, PLAYER_2_PATH, PLAYER_2_CPUS)
         ]
 
-        for player in players:
-            player.build()
-        for player in players:
-            player.run()
-        for round_num in range(1, NUM_ROUNDS + 1):
-            self.log.append('')
-            self.log.append('Round #' + str(round_num) + STATUS(players))
-            self.run_round(players)
-            players = players[::-1]
+        started = time.perf_counter()
+        sequential = self.start_players(players, Player.build, by_path=True)
+        built = time.perf_counter()
+        sequential += self.start_players(players, Player.run)
+        self.report_startup(started, built, time.perf_counter(), sequential)
+        first_round = 1
+        if self.checkpoint is not None:
+            players = self.resume(players)
+            first_round = self.checkpoint['round_num'] + 1
+        batched = NUM_TABLES > 1 and all('batch' in player.capabilities for player in players)
+        if NUM_TABLES > 1 and not batched:
+            print('Playing one table - both bots must list "batch" under "capabilities" in commands.json')
+        if batched:
+            players = self.run_tables(players, first_round)
+        else:
+            for round_num in range(first_round, NUM_ROUNDS + 1):
+                self.round_num = round_num
+                self.log.append('')
+                self.log.append('Round #' + str(round_num) + STATUS(players))
+                recorded, fast_forward = self.replayed(round_num)
+                self.run_round(players, recorded, fast_forward)
+                players = players[::-1]
+                if self.stats.decided():
+                    break
+                if CHECKPOINT_FILENAME is not None and round_num % CHECKPOINT_INTERVAL == 0 and round_num < NUM_ROUNDS:
+                    self.save_checkpoint(players)
             
         self.log.append('')
+        if self.round_num < NUM_ROUNDS:
+            self.log.append('Stopped after round {}: {} is {} at {:g}% confidence'.format(
+                self.round_num, PLAYER_1_NAME, 'ahead' if self.stats.interval()[0] > 0 else 'behind',
+                100 * STOP_CONFIDENCE))
         self.log.append('Final' + STATUS(players))
+        self.log.extend(self.stats.summary())
         
         for player in players:
             self.log.append('{} preflop bets EV: {}'.format(player.name, self.ev_preflop_bets[player.name]))
             self.log.append('{} flop bets EV: {}'.format(player.name, self.ev_flop_bets[player.name]))
             self.log.append('{} turn bets EV: {}'.format(player.name, self.ev_turn_bets[player.name]))
-            player.stop()
+            self.log.append('{} time used: {:.3f}s wall, {:.3f}s response, {:.3f}s cpu (charged {})'.format(
+                player.name, player.time_used['wall'], player.time_used['response'], player.cpu_used(),
+                GAME_CLOCK_MODE))
+            player.stop(self.unsent(player))
+        mean, half_width = self.stats.interval()
+        self.emit('final', bankrolls={player.name: player.bankroll for player in players},
+                  rounds=self.stats.rounds, mean=mean, half_width=half_width)
+        if self.events is not None:
+            self.events.close()
         name = GAME_LOG_FILENAME + '.txt'
         print('Writing', name)
-        with open(name, 'w') as log_file:
+        with open(name, 'r+' if self.log_offset else 'w') as log_file:
+            log_file.seek(self.log_offset)
+            log_file.truncate()
             log_file.write('\n'.join(self.log))
+        if CHECKPOINT_FILENAME is not None and os.path.exists(CHECKPOINT_FILENAME):
+            os.remove(CHECKPOINT_FILENAME)
+
+
+LOADED = time.perf_counter()
 
 
 if __name__ == '__main__':
-    Game().run()
\ No newline at end of file
+    if PROFILE_ENGINE:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.runcall(Game().run)
+        print('Writing engine.prof')
+        profiler.dump_stats('engine.prof')
+    else:
+        Game().run()
\ No newline at end of file
@@ -0,0 +1,331 @@
+'''
+Loads game logs and EVENT_STREAM recordings into an indexed SQLite database, so that whole
+matches can be analysed with SQL instead of by reading gamelog.txt.
+
+Run from the repository root:
+
+    python hand_history.py matches.db gamelog.txt events.jsonl
+    python hand_history.py matches.db --query "SELECT player, COUNT(*), AVG(delta) FROM discards GROUP BY player"
+
+Each file becomes one match; the format is detected from its first line. Files are read
+as a stream and inserted in batches of BATCH_ROUNDS rounds, one transaction per batch.
+Recordings carry more than game logs: the players' clocks and the latency of each action.
+A match resumed from a checkpoint records the rounds after the checkpoint again, and only
+the last recording of a round is kept. A file that fails to load leaves no rows behind.
+
+Tables, all keyed by (match, round):
+
+    matches   id, source, format, player0, player1 (the names of the first round's seats)
+    rounds    player0 and player1 (seat 0 posts the small blind), hand0 and hand1 (the cards dealt),
+              board, street (where the round ended), showdown (0 or 1), delta0 and delta1
+    actions   seq (order within the round), street, seat, player, code ('F', 'C', 'K', 'R' or 'D'),
+              amount (raises only), card (discards only), clock and latency (recordings only)
+    streets   street (2 to 6), board, pot and the stacks after the previous street's betting
+    discards  seat, player, street, card, rank (0 for a two, 12 for an ace), hand (the three
+              cards held before discarding), flop, position (the card's rank order in the hand,
+              0 lowest to 2 highest, ties counting as higher), flop_paired (0 or 1) and
+              delta (the round's result for that player)
+'''
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+from config import STARTING_STACK
+
+RANKS = '23456789TJQKA'
+STREET_NAMES = {'Flop': 2, 'Discard 1': 3, 'Discard 2': 4, 'Turn': 5, 'River': 6}
+BATCH_ROUNDS = 10000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY, source TEXT, format TEXT, player0 TEXT, player1 TEXT, ingested REAL);
+CREATE TABLE IF NOT EXISTS rounds (
+    match INTEGER, round INTEGER, player0 TEXT, player1 TEXT, hand0 TEXT, hand1 TEXT, board TEXT,
+    street INTEGER, showdown INTEGER, delta0 INTEGER, delta1 INTEGER,
+    PRIMARY KEY (match, round)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS actions (
+    match INTEGER, round INTEGER, seq INTEGER, street INTEGER, seat INTEGER, player TEXT, code TEXT,
+    amount INTEGER, card TEXT, clock REAL, latency REAL,
+    PRIMARY KEY (match, round, seq)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS streets (
+    match INTEGER, round INTEGER, street INTEGER, board TEXT, pot INTEGER, stack0 INTEGER, stack1 INTEGER,
+    PRIMARY KEY (match, round, street)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS discards (
+    match INTEGER, round INTEGER, seat INTEGER, player TEXT, street INTEGER, card TEXT, rank INTEGER,
+    hand TEXT, flop TEXT, position INTEGER, flop_paired INTEGER, delta INTEGER,
+    PRIMARY KEY (match, round, seat)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rounds_player0 ON rounds (player0, delta0);
+CREATE INDEX IF NOT EXISTS rounds_player1 ON rounds (player1, delta1);
+CREATE INDEX IF NOT EXISTS actions_player ON actions (player, street, code, amount);
+CREATE INDEX IF NOT EXISTS discards_player ON discards (player, flop_paired, position, rank, delta);
+'''
+
+ROUND_LINE = re.compile(r'Round #(\d+), (.+) \(-?\d+\), (.+) \(-?\d+\)$')
+STREET_LINE = re.compile(r'(Flop|Discard 1|Discard 2|Turn|River) \[(.*)\], .+ \((\d+)\), .+ \((\d+)\)$')
+STACKS_LINE = re.compile(r'Current stacks: (\d+), (\d+)$')
+TABLES = ['rounds', 'actions', 'streets', 'discards']
+
+
+class Round():
+    '''
+    One round being read, turned into table rows once its result is known.
+    '''
+
+    def __init__(self, number, players):
+        self.number = number
+        self.players = players
+        self.hands = [[], []]  # the cards currently held
+        self.dealt = [None, None]
+        self.board = []
+        self.flop = None
+        self.street = 0
+        self.showdown = False
+        self.actions = []
+        self.streets = []
+        self.discards = []  # (seat, street, card, hand held before it)
+
+    def deal(self, seat, cards):
+        self.hands[seat] = list(cards)
+        self.dealt[seat] = ' '.join(cards)
+
+    def new_street(self, street, board, stacks):
+        self.street = street
+        self.board = list(board)
+        if street == 2:
+            self.flop = self.board[:2]
+        self.streets.append([street, ' '.join(board), 2 * STARTING_STACK - stacks[0] - stacks[1],
+                             stacks[0], stacks[1]])
+
+    def act(self, seat, code, amount=None, card=None, clock=None, latency=None):
+        if code == 'D':
+            self.discards.append((seat, self.street, card, list(self.hands[seat])))
+            self.hands[seat].remove(card)
+        self.actions.append((len(self.actions), self.street, seat, self.players[seat], code, amount, card, clock,
+                             latency))
+
+    def rows(self, match, deltas):
+        '''
+        Returns the rows of each table for this round, given both players' deltas.
+        '''
+        key = (match, self.number)
+        rounds = [key + (self.players[0], self.players[1], self.dealt[0], self.dealt[1], ' '.join(self.board),
+                         self.street, int(self.showdown), deltas[0], deltas[1])]
+        actions = [key + action for action in self.actions]
+        streets = [key + tuple(street) for street in self.streets]
+        discards = []
+        for seat, street, card, hand in self.discards:
+            rank = RANKS.index(card[0])
+            position = sum(RANKS.index(other[0]) <= rank for other in hand) - 1
+            flop = self.flop or []
+            paired = int(len(flop) == 2 and flop[0][0] == flop[1][0])
+            discards.append(key + (seat, self.players[seat], street, card, rank, ' '.join(hand), ' '.join(flop),
+                                   position, paired, deltas[seat]))
+        return rounds, actions, streets, discards
+
+
+def read_gamelog(lines):
+    '''
+    Yields (players, Round, deltas) for each complete round of a game log.
+    '''
+    current = None
+    deltas = [None, None]
+    for line in lines:
+        line = line.rstrip('\n')
+        if line.startswith('Round #'):
+            match = ROUND_LINE.match(line)
+            if match is not None:
+                current = Round(int(match.group(1)), [match.group(2), match.group(3)])
+                deltas = [None, None]
+            continue
+        if current is None:
+            continue
+        match = STREET_LINE.match(line)
+        if match is not None:
+            # the log shows each player's contribution this round, which gives the stacks
+            board = match.group(2).split()
+            contributions = int(match.group(3)), int(match.group(4))
+            current.new_street(STREET_NAMES[match.group(1)], board,
+                               [STARTING_STACK - contributions[0], STARTING_STACK - contributions[1]])
+            continue
+        if STACKS_LINE.match(line):
+            continue
+        for seat, name in enumerate(current.players):
+            if not line.startswith(name + ' '):
+                continue
+            words = line[len(name) + 1:].split(' ')
+            verb = words[0]
+            if verb == 'dealt':
+                current.deal(seat, line[line.index('[') + 1:-1].split())
+            elif verb == 'folds':
+                current.act(seat, 'F')
+            elif verb == 'calls':
+                current.act(seat, 'C')
+            elif verb == 'checks':
+                current.act(seat, 'K')
+            elif verb in ('bets', 'raises'):
+                current.act(seat, 'R', amount=int(words[-1]))
+            elif verb == 'discards':
+                current.act(seat, 'D', card=words[1])
+            elif verb == 'shows':
+                current.showdown = True
+            elif verb == 'awarded':
+                deltas[seat] = int(words[1])
+                if None not in deltas:
+                    yield current.players, current, deltas
+                    current = None
+            break
+
+
+def read_events(lines):
+    '''
+    Yields (players, Round, deltas) for each complete round of an EVENT_STREAM recording.
+    Rounds from several tables may interleave, so unfinished rounds are kept by number.
+    '''
+    pending = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # a match that crashed may end with a partial line
+        event = record['event']
+        if event == 'deal':
+            players = record['players']
+            current = pending[record['round']] = Round(record['round'], players)
+            for seat, name in enumerate(players):
+                current.deal(seat, record['hands'][name])
+            continue
+        if event == 'resume':
+            # the unfinished rounds are played again after the checkpoint; finished ones are replaced in ingest
+            for number in [number for number in pending if number >= record['round']]:
+                del pending[number]
+            continue
+        current = pending.get(record.get('round'))
+        if current is None:
+            continue
+        if event == 'action':
+            seat = current.players.index(record['player'])
+            code = record['action']
+            amount = int(code[1:]) if code[0] == 'R' else None
+            card = current.hands[seat][int(code[1:])] if code[0] == 'D' else None
+            current.act(seat, code[0], amount, card, record.get('clock'), record.get('latency'))
+        elif event == 'street':
+            current.new_street(record['street'], record['board'], [record['stacks'][name] for name in current.players])
+        elif event == 'result':
+            del pending[record['round']]
+            current.street = record['street']
+            # recordings have no showdown event, but every round that does not end in a fold has one
+            current.showdown = not current.actions or current.actions[-1][4] != 'F'
+            yield current.players, current, [record['deltas'][name] for name in current.players]
+
+
+def connect(path):
+    '''
+    Opens (creating if needed) a hand history database.
+    '''
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    db.execute('PRAGMA journal_mode = WAL')
+    db.execute('PRAGMA synchronous = NORMAL')
+    db.execute('PRAGMA mmap_size = 1073741824')  # large scans read the file without copying pages
+    return db
+
+
+def ingest(db, path):
+    '''
+    Loads one game log or recording as a new match, and returns its id and number of rounds.
+    '''
+    with open(path, 'r') as source:
+        first = source.readline()
+        source.seek(0)
+        kind = 'events' if first.startswith('{') else 'gamelog'
+        reader = read_events(source) if kind == 'events' else read_gamelog(source)
+        with db:
+            match = db.execute('INSERT INTO matches (source, format, ingested) VALUES (?, ?, ?)',
+                               (os.path.abspath(path), kind, time.time())).lastrowid
+        try:
+            seen = set()
+            batched = 0
+            batch = ([], [], [], [])
+            first_players = None
+            for players, current, deltas in reader:
+                first_players = first_players or players
+                if current.number in seen:
+                    # recorded again after a resume; the earlier recording was superseded
+                    insert(db, batch)
+                    batch = ([], [], [], [])
+                    delete(db, match, current.number)
+                seen.add(current.number)
+                for rows, new in zip(batch, current.rows(match, deltas)):
+                    rows.extend(new)
+                batched += 1
+                if batched % BATCH_ROUNDS == 0:
+                    insert(db, batch)
+                    batch = ([], [], [], [])
+            insert(db, batch)
+            with db:
+                db.execute('UPDATE matches SET player0 = ?, player1 = ? WHERE id = ?',
+                           (*(first_players or [None, None]), match))
+        except BaseException:
+            delete(db, match)
+            raise
+    return match, len(seen)
+
+
+def insert(db, batch):
+    '''
+    Writes one batch of rows in a single transaction.
+    '''
+    rounds, actions, streets, discards = batch
+    with db:
+        db.executemany('INSERT INTO rounds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rounds)
+        db.executemany('INSERT INTO actions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', actions)
+        db.executemany('INSERT INTO streets VALUES (?, ?, ?, ?, ?, ?, ?)', streets)
+        db.executemany('INSERT INTO discards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', discards)
+
+
+def delete(db, match, round_num=None):
+    '''
+    Removes one round of a match, or the whole match, from every table.
+    '''
+    with db:
+        if round_num is None:
+            for table in TABLES:
+                db.execute('DELETE FROM {} WHERE match = ?'.format(table), (match,))
+            db.execute('DELETE FROM matches WHERE id = ?', (match,))
+        else:
+            for table in TABLES:
+                db.execute('DELETE FROM {} WHERE match = ? AND round = ?'.format(table), (match, round_num))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loads game logs and event recordings into a SQLite database.')
+    parser.add_argument('database')
+    parser.add_argument('files', nargs='*', help='game logs or EVENT_STREAM recordings to add')
+    parser.add_argument('--query', help='an SQL query to run after loading, printed as tab-separated rows')
+    args = parser.parse_args()
+    db = connect(args.database)
+    for path in args.files:
+        start = time.perf_counter()
+        match, count = ingest(db, path)
+        print('Loaded {} rounds from {} as match {} in {:.1f} s'.format(count, path, match,
+                                                                      time.perf_counter() - start))
+    if args.files:
+        db.execute('ANALYZE')
+    if args.query is not None:
+        start = time.perf_counter()
+        cursor = db.execute(args.query)
+        if cursor.description is not None:
+            print('\t'.join(column[0] for column in cursor.description))
+        for row in cursor:
+            print('\t'.join(map(str, row)))
+        print('({:.3f} s)'.format(time.perf_counter() - start), file=sys.stderr)
+    db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
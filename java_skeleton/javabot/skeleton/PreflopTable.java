@@ -0,0 +1,72 @@
+package javabot.skeleton;
+
+import java.io.IOException;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.file.Files;
+import java.nio.file.Paths;
+import java.util.Arrays;
+import java.util.List;
+
+/**
+ * The equity table in preflop_equity.bin, generated by build_preflop.py in the repository root.
+ *
+ * Holds the equity of every 3-card starting hand against a random hand, as the small blind
+ * (active 0) and as the big blind (active 1), playing through both discards to showdown.
+ * Hands that differ only by their suits share a class, numbered from 0 to numClasses - 1.
+ */
+public class PreflopTable {
+    private static final int NUM_HANDS = 22100;  // 52 choose 3
+    private static final String RANKS = "23456789TJQKA";
+    private static final String SUITS = "cdhs";
+
+    public final int numClasses;
+    public final int samples;
+    private final char[] classes = new char[NUM_HANDS];
+    private final char[] equities;
+
+    public PreflopTable() throws IOException {
+        this("preflop_equity.bin");
+    }
+
+    public PreflopTable(String path) throws IOException {
+        ByteBuffer data = ByteBuffer.wrap(Files.readAllBytes(Paths.get(path))).order(ByteOrder.LITTLE_ENDIAN);
+        byte[] magic = new byte[4];
+        data.get(magic);
+        if (!new String(magic, "US-ASCII").equals("PFE3")) {
+            throw new IOException(path + " is not a preflop equity table");
+        }
+        this.numClasses = data.getInt();
+        this.samples = data.getInt();
+        this.equities = new char[2 * this.numClasses];
+        data.asCharBuffer().get(this.classes).get(this.equities);
+    }
+
+    /**
+     * Returns the position of a 3-card hand in the table, whatever the order of its cards.
+     */
+    private static int handIndex(List<String> cards) {
+        int[] index = new int[3];
+        for (int i = 0; i < 3; i++) {
+            String card = cards.get(i);
+            index[i] = 4 * RANKS.indexOf(card.charAt(0)) + SUITS.indexOf(card.charAt(1));
+        }
+        Arrays.sort(index);
+        int a = index[0], b = index[1], c = index[2];
+        return a + b * (b - 1) / 2 + c * (c - 1) * (c - 2) / 6;
+    }
+
+    /**
+     * Returns the class of a 3-card hand.
+     */
+    public int handClass(List<String> cards) {
+        return this.classes[handIndex(cards)];
+    }
+
+    /**
+     * Returns the share of the pot a 3-card hand wins on average as player active.
+     */
+    public double equity(List<String> cards, int active) {
+        return this.equities[2 * this.handClass(cards) + active] / 65535.0;
+    }
+}
@@ -83,6 +83,11 @@ public class Runner {
                         gameState = new GameState(gameState.bankroll, Float.parseFloat(leftover), gameState.roundNum);
                         break;
                     }
+                    case 'N': {
+                        // a resumed match continues from this round
+                        gameState = new GameState(gameState.bankroll, gameState.gameClock, Integer.parseInt(leftover));
+                        break;
+                    }
                     case 'P': {
                         active = Integer.parseInt(leftover);
                         break;
@@ -174,7 +179,8 @@ public class Runner {
                     }
                 }
             }
-            if (roundFlag || roundState instanceof TerminalState) { // ack the engine
+            // ack the engine; with "fused", the end of a round arrives with the next round instead
+            if (roundFlag || roundState instanceof TerminalState) {
                 this.send(new Action(ActionType.CHECK_ACTION_TYPE));
             } else {
                 Action action = this.pokerbot.getAction(gameState, (RoundState) roundState, active);
@@ -0,0 +1,36 @@
+'''
+Optionally compiles skeleton/cstates.pyx, a faster RoundState, with Cython.
+
+    python3 build.py
+
+The bot runs the same with or without it; skeleton.states picks up the compiled
+RoundState when it exists. To build it for every match, set "build" in commands.json
+to ["python3", "build.py"]. Without Cython installed, this prints a note and leaves the
+pure Python RoundState in use.
+'''
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    try:
+        from Cython.Build import cythonize
+        from setuptools import Extension, setup
+    except ImportError:
+        print('Cython or setuptools not installed - using the pure Python RoundState')
+        return 0
+    os.chdir(ROOT)
+    with tempfile.TemporaryDirectory() as build_temp:
+        # explicit (empty) package lists stop setuptools from scanning the bot's directory
+        setup(ext_modules=cythonize([Extension('skeleton.cstates', ['skeleton/cstates.pyx'])], quiet=True),
+              packages=[], py_modules=[],
+              script_args=['build_ext', '--inplace', '--build-temp', build_temp, '--build-lib', build_temp])
+    os.remove(os.path.join('skeleton', 'cstates.c'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,7 +6,19 @@ This file contains the base class that you should implement for your pokerbot.
 class Bot():
     '''
     The base class for a pokerbot.
+
+    Before the first decision the runner sets budget to a TimeBudget, unless the bot already
+    set its own, e.g. with different weights. During get_action, budget.time_left() gives
+    the seconds the current decision may take, for searches that can stop at any time.
+
+    Set manual_gc = True to take garbage collection off the game clock. The runner then freezes
+    everything created in __init__ out of later collections, turns off automatic collection,
+    and collects once after each round instead, right after the response that ends it,
+    printing the time taken to your log. That is usually while the opponent is acting, but
+    a message from the engine that arrives during a collection waits for it on your clock.
     '''
+    budget = None
+    manual_gc = False
 
     def handle_new_round(self, game_state, round_state, active):
         '''
@@ -50,3 +62,38 @@ class Bot():
         Your action.
         '''
         raise NotImplementedError('get_action')
+
+    def get_actions(self, game_state, round_states, actives):
+        '''
+        Called instead of get_action when the engine plays several tables at once
+        (NUM_TABLES > 1), with every decision currently pending for your bot.
+        Rounds on different tables interleave, so keep any per-round state keyed by table.
+        Override this to decide for all tables together, e.g. with one vectorized policy call.
+
+        Arguments:
+        game_state: the GameState object.
+        round_states: a dict from table number to the RoundState object on that table.
+        actives: a dict from table number to your player's index on that table.
+
+        Returns:
+        A dict from table number to your action on that table.
+        '''
+        return {table: self.get_action(game_state, round_state, actives[table])
+                for table, round_state in round_states.items()}
+
+    def ponder(self, game_state, stop):
+        '''
+        Optional. If you override this, it runs on a worker thread after each of your responses,
+        while your bot waits for the engine's next message, which is not charged to your game clock.
+        Use it to continue work such as a search for your likely next decision. As soon as the
+        message arrives, stop is set and the runner waits for this method to return before
+        calling any other, so check stop.is_set() often.
+
+        Arguments:
+        game_state: the GameState object as of your last response.
+        stop: a threading.Event that is set once the engine's next message arrives.
+
+        Returns:
+        Nothing.
+        '''
+        pass
@@ -0,0 +1,89 @@
+'''
+An anytime time manager that splits the game clock into per-decision budgets.
+'''
+import time
+from .states import NUM_ROUNDS, STARTING_STACK
+
+STREET_WEIGHTS = {0: 1., 2: 1.5, 3: 1.5, 4: 2., 5: 2., 6: 2.}  # relative thinking time per street
+PRIOR_ROUNDS = 20  # how many rounds of evidence the initial guesses are worth
+
+
+class TimeBudget():
+    '''
+    Hands each decision a share of the remaining game clock.
+
+    The runner calls start before get_action (or get_actions) and finish after it, so search
+    code only polls time_left(), which returns the seconds left for the current decision.
+
+    A decision's weight is STREET_WEIGHTS[street], scaled up to three times as the pot grows.
+    Its share of the clock is its weight over the weight expected in the rest of the match, i.e.
+    the rounds left times the average weight of a round so far. The clock counted is what the
+    engine reports minus a reserve and the messaging overhead expected for the remaining
+    decisions, both learned as the match goes. Since every share starts from the clock the
+    engine reports, time overspent on one decision is taken from all the later ones.
+    '''
+
+    def __init__(self, reserve=1., max_share=0.1, round_weight=4., round_decisions=3., overhead=0.001):
+        self.reserve = reserve  # seconds never handed out
+        self.max_share = max_share  # the largest fraction of the usable clock one decision may get
+        self.priors = {'weight': round_weight, 'decisions': round_decisions, 'overhead': overhead}
+        self.first_round = None
+        self.total_weight = 0.
+        self.total_decisions = 0
+        self.total_overhead = 0.
+        self.overhead_samples = 0
+        self.last_clock = None
+        self.thinking = 0.
+        self.started = time.perf_counter()
+        self.deadline = self.started
+        self.allotted = 0.
+
+    def weight(self, round_state):
+        '''
+        Returns how much thinking time a decision in this round state deserves, relative to others.
+        '''
+        pot = 2 * STARTING_STACK - round_state.stacks[0] - round_state.stacks[1]
+        return STREET_WEIGHTS.get(round_state.street, 1.) * (1 + pot / STARTING_STACK)
+
+    def average(self, name, total, count):
+        '''
+        Returns a running average that starts at the prior and moves to the observed mean.
+        '''
+        return (self.priors[name] * PRIOR_ROUNDS + total) / (PRIOR_ROUNDS + count)
+
+    def start(self, game_state, *round_states):
+        '''
+        Starts the budget for one decision, or for the decisions on several tables answered together.
+        '''
+        now = time.perf_counter()
+        if self.first_round is None:
+            self.first_round = game_state.round_num
+        if self.last_clock is not None:
+            # everything charged since the last decision that was not spent thinking
+            self.total_overhead += max(self.last_clock - game_state.game_clock - self.thinking, 0.)
+            self.overhead_samples += 1
+        weight = sum(map(self.weight, round_states))
+        self.total_weight += weight
+        self.total_decisions += len(round_states)
+        rounds_seen = game_state.round_num - self.first_round + 1
+        remaining = max(NUM_ROUNDS - game_state.round_num + 1, 1)
+        round_weight = self.average('weight', self.total_weight, rounds_seen)
+        decisions = remaining * self.average('decisions', self.total_decisions, rounds_seen)
+        overhead = decisions * self.average('overhead', self.total_overhead, self.overhead_samples)
+        usable = max(game_state.game_clock - self.reserve - overhead, 0.)
+        self.allotted = min(usable * weight / (remaining * round_weight), self.max_share * usable)
+        self.started = now
+        self.deadline = now + self.allotted
+        self.last_clock = game_state.game_clock
+
+    def finish(self):
+        '''
+        Records that the current decision has been made.
+        '''
+        self.thinking = time.perf_counter() - self.started
+
+    def time_left(self):
+        '''
+        Returns the seconds left for the current decision, or 0 once its budget is spent.
+        '''
+        return max(self.deadline - time.perf_counter(), 0.)
@@ -0,0 +1,178 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+'''
+A compiled RoundState with typed fields, used by states.py in place of the pure Python one
+once built with `python3 build.py`.
+
+It follows states.py exactly, including the in-place updates of hands and board on discards,
+and keeps the namedtuple interface bots rely on: the same fields, unpacking, indexing,
+_replace and equality. pips and stacks are stored as C integers, so reading them
+returns a new list each time.
+'''
+from .actions import FoldAction, CallAction, CheckAction, RaiseAction, DiscardAction
+from .states import TerminalState, STARTING_STACK, BIG_BLIND
+
+
+cdef RoundState make_state(int button, int street, int pip0, int pip1, int stack0, int stack1,
+                           list hands, list board, object previous_state):
+    cdef RoundState state = RoundState.__new__(RoundState)
+    state.button = button
+    state.street = street
+    state.pip[0] = pip0
+    state.pip[1] = pip1
+    state.stack[0] = stack0
+    state.stack[1] = stack1
+    state.hands = hands
+    state.board = board
+    state.previous_state = previous_state
+    return state
+
+
+cdef class RoundState:
+    '''
+    Encodes the game tree for one round of poker.
+    '''
+    cdef readonly int button
+    cdef readonly int street
+    cdef int pip[2]
+    cdef int stack[2]
+    cdef readonly list hands
+    cdef readonly list board
+    cdef readonly object previous_state
+
+    _fields = ('button', 'street', 'pips', 'stacks', 'hands', 'board', 'previous_state')
+
+    def __init__(self, int button, int street, pips, stacks, hands, board, previous_state):
+        self.button = button
+        self.street = street
+        self.pip[0], self.pip[1] = pips
+        self.stack[0], self.stack[1] = stacks
+        self.hands = hands if type(hands) is list else list(hands)
+        self.board = board if type(board) is list else list(board)
+        self.previous_state = previous_state
+
+    @property
+    def pips(self):
+        return [self.pip[0], self.pip[1]]
+
+    @property
+    def stacks(self):
+        return [self.stack[0], self.stack[1]]
+
+    def __iter__(self):
+        return iter((self.button, self.street, self.pips, self.stacks, self.hands, self.board, self.previous_state))
+
+    def __len__(self):
+        return 7
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, RoundState):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __reduce__(self):
+        return (RoundState, tuple(self))
+
+    def __repr__(self):
+        return 'RoundState(button={!r}, street={!r}, pips={!r}, stacks={!r}, hands={!r}, board={!r}, previous_state={!r})'.format(*self)
+
+    def _replace(self, **changes):
+        fields = dict(zip(self._fields, self))
+        fields.update(changes)
+        return RoundState(*[fields[name] for name in self._fields])
+
+    cpdef showdown(self):
+        '''
+        Compares the players' hands and computes payoffs.
+        '''
+        return TerminalState([0, 0], self)
+
+    cpdef legal_actions(self):
+        '''
+        Returns a set which corresponds to the active player's legal moves.
+        '''
+        cdef int active = self.button % 2
+        cdef int continue_cost = self.pip[1-active] - self.pip[active]
+        if self.street == 2 or self.street == 3:
+            return {DiscardAction} if active != self.street % 2 else {CheckAction}
+        if continue_cost == 0:
+            # we can only raise the stakes if both players can afford it
+            if self.stack[0] == 0 or self.stack[1] == 0:
+                return {CheckAction, FoldAction}
+            return {CheckAction, RaiseAction, FoldAction}
+        # similarly, re-raising is only allowed if both players can afford it
+        if continue_cost == self.stack[active] or self.stack[1-active] == 0:
+            return {FoldAction, CallAction}
+        return {FoldAction, CallAction, RaiseAction}
+
+    cpdef raise_bounds(self):
+        '''
+        Returns a tuple of the minimum and maximum legal raises.
+        '''
+        cdef int active = self.button % 2
+        cdef int continue_cost = self.pip[1-active] - self.pip[active]
+        cdef int max_contribution = min(self.stack[active], self.stack[1-active] + continue_cost)
+        cdef int min_contribution = min(max_contribution, continue_cost + max(continue_cost, BIG_BLIND))
+        return (self.pip[active] + min_contribution, self.pip[active] + max_contribution)
+
+    cpdef proceed_street(self):
+        '''
+        Resets the players' pips and advances the game tree to the next round of betting.
+        '''
+        cdef int new_street, button
+        if self.street == 6:
+            return self.showdown()
+        elif self.street == 0:
+            new_street = 2
+            button = 1
+        elif self.street == 2:
+            new_street = 3
+            button = 0
+        else:
+            new_street = self.street + 1
+            button = 1
+        return make_state(button, new_street, 0, 0, self.stack[0], self.stack[1], self.hands, self.board, self)
+
+    cpdef proceed(self, action):
+        '''
+        Advances the game tree by one action performed by the active player.
+        '''
+        cdef int active = self.button % 2
+        cdef int delta, contribution
+        cdef list hand
+        cdef RoundState state
+        if isinstance(action, DiscardAction):
+            hand = self.hands[active]
+            if len(hand) != 0:
+                self.board.append(hand.pop(action.card))
+            return make_state((1 - active) % 2, self.street, self.pip[0], self.pip[1], self.stack[0], self.stack[1],
+                              self.hands, self.board, self)
+        if isinstance(action, FoldAction):
+            delta = self.stack[0] - STARTING_STACK if active == 0 else STARTING_STACK - self.stack[1]
+            return TerminalState([delta, -delta], self)
+        if isinstance(action, CallAction):
+            if self.button == 0:  # sb calls bb
+                return make_state(1, 0, BIG_BLIND, BIG_BLIND, STARTING_STACK - BIG_BLIND, STARTING_STACK - BIG_BLIND,
+                                  self.hands, self.board, self)
+            # both players acted
+            state = make_state(self.button + 1, self.street, self.pip[0], self.pip[1], self.stack[0], self.stack[1],
+                               self.hands, self.board, self)
+            contribution = state.pip[1-active] - state.pip[active]
+            state.stack[active] -= contribution
+            state.pip[active] += contribution
+            return state.proceed_street()
+        if isinstance(action, CheckAction):
+            if (self.street == 0 and self.button > 0) or self.button > 1 or self.street == 2 or self.street == 3:
+                return self.proceed_street()
+            # let opponent act
+            return make_state(self.button + 1, self.street, self.pip[0], self.pip[1], self.stack[0], self.stack[1],
+                              self.hands, self.board, self)
+        # isinstance(action, RaiseAction)
+        state = make_state(self.button + 1, self.street, self.pip[0], self.pip[1], self.stack[0], self.stack[1],
+                           self.hands, self.board, self)
+        contribution = action.amount - state.pip[active]
+        state.stack[active] -= contribution
+        state.pip[active] += contribution
+        return state
@@ -0,0 +1,159 @@
+'''
+A vectorized hand evaluator that does the board's work once and then scores many hole-card
+holdings against it. Needs numpy.
+
+Scores are the same integers pkrbot.evaluate returns for the same cards, so the two can be
+compared and mixed freely.
+'''
+import numpy as np
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+CARDS = [rank + suit for rank in RANKS for suit in SUITS]  # index = 4 * rank + suit
+INDEX = {card: i for i, card in enumerate(CARDS)}
+
+HIGH_CARD, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH = (
+    category << 20 for category in range(1, 10))
+
+RANK_BITS = np.array([1 << (i // 4) for i in range(52)], dtype=np.int64)
+SUIT_BITS = np.array([1 << (16 * (i % 4) + i // 4) for i in range(52)], dtype=np.int64)  # one 16-bit lane per suit
+
+
+def _rank_tables():
+    '''
+    Builds the lookup tables over 13-bit rank masks.
+    '''
+    masks = np.arange(1 << 13, dtype=np.int64)
+    count = np.zeros_like(masks)
+    high = np.zeros_like(masks)
+    for rank in range(13):
+        bit = (masks >> rank) & 1
+        count += bit
+        high = np.where(bit != 0, rank, high)
+    top_bit = np.where(masks != 0, 1 << high, 0)
+    top5 = masks.copy()
+    while (count[top5] > 5).any():
+        top5 = np.where(count[top5] > 5, top5 & (top5 - 1), top5)  # drop the lowest rank
+    kickers = np.zeros_like(masks)  # the three highest ranks as nibbles, highest first
+    rest = masks
+    for shift in (12, 8, 4):
+        kickers |= np.where(rest != 0, high[rest] << shift, 0)
+        rest = rest ^ top_bit[rest]
+    straight = np.zeros_like(masks)  # the straight's rank as pkrbot encodes it, 0 for none
+    for top in range(3, 13):
+        window = 0b1000000001111 if top == 3 else 0b11111 << (top - 4)  # the wheel plays the ace low
+        straight = np.where((masks & window) == window, top - 2, straight)
+    return count, high, top_bit, top5, kickers, straight
+
+
+COUNT, HIGH, TOP_BIT, TOP5, KICKERS, STRAIGHT_RANK = _rank_tables()
+
+
+def card_indices(cards):
+    '''
+    Returns cards in common format (or already as indices) as an array of card indices.
+    '''
+    if isinstance(cards, np.ndarray):
+        return cards.astype(np.intp, copy=False)
+    return np.array([INDEX[card] if isinstance(card, str) else card for card in cards], dtype=np.intp)
+
+
+def add_cards(masks, cards):
+    '''
+    Returns the masks after adding one card per element of cards, which broadcasts against them.
+
+    masks is (ranks held at least once, twice, three times, four times, suit lanes).
+    '''
+    ones, twos, threes, fours, suits = masks
+    bit = RANK_BITS[cards]
+    return (ones | bit, twos | (bit & ones), threes | (bit & twos), fours | (bit & threes), suits | SUIT_BITS[cards])
+
+
+def score(masks, flush_suits=range(4)):
+    '''
+    Returns the pkrbot score of the best five cards described by masks.
+    Only suits in flush_suits are checked for a flush.
+    '''
+    ones, twos, threes, fours, suits = masks
+    flush = np.zeros_like(ones)
+    for suit in flush_suits:
+        lane = (suits >> (16 * suit)) & 0x1fff
+        flush = np.where(COUNT[lane] >= 5, lane, flush)  # eight cards hold at most one flush suit
+    values = HIGH_CARD | TOP5[ones]
+    pair = TOP_BIT[twos]
+    values = np.where(twos != 0, PAIR | HIGH[twos] << 16 | KICKERS[ones & ~pair], values)
+    second = TOP_BIT[twos ^ pair]
+    values = np.where(second != 0, TWO_PAIR | HIGH[twos] << 16 | HIGH[twos ^ pair] << 12
+                      | HIGH[ones & ~(pair | second)] << 8, values)
+    trips = TOP_BIT[threes]
+    values = np.where(threes != 0, TRIPS | HIGH[threes] << 16 | KICKERS[ones & ~trips] & 0xff00, values)
+    straight = STRAIGHT_RANK[ones]
+    values = np.where(straight != 0, STRAIGHT | straight << 16, values)
+    values = np.where(flush != 0, FLUSH | TOP5[flush], values)
+    full = twos & ~trips
+    values = np.where((threes != 0) & (full != 0), FULL_HOUSE | HIGH[threes] << 16 | HIGH[full] << 12, values)
+    values = np.where(fours != 0, QUADS | HIGH[fours] << 16 | KICKERS[ones & ~TOP_BIT[fours]] & 0xf000, values)
+    straight_flush = STRAIGHT_RANK[flush]
+    return np.where(straight_flush != 0, STRAIGHT_FLUSH | straight_flush << 16, values)
+
+
+class BoardContext():
+    '''
+    The rank counts and per-suit rank masks of one board, or of many boards at once.
+
+    Build it once per board, then score any number of holdings against it. Every hand but a
+    flush depends only on the ranks held, so each distinct set of hole-card ranks is scored
+    once, adding its ranks to the board's masks before the best hand is read off lookup
+    tables. Flushes are then checked only for the holdings and boards that can make one.
+
+    board is a list of cards (common format strings or indices) or an array of card indices
+    with one row per board. score(holdings) takes an array with one row of card indices per
+    holding, and returns one score per holding, or per board and holding as a
+    (boards, holdings) array when several boards were given.
+    '''
+
+    def __init__(self, board):
+        board = card_indices(board)
+        shape = board.shape[:-1] + (1,) if board.ndim > 1 else ()
+        masks = tuple(np.zeros(shape, dtype=np.int64) for _ in range(5))
+        for i in range(board.shape[-1]):
+            masks = add_cards(masks, board[..., i:i + 1] if board.ndim > 1 else board[i])
+        self.masks = masks
+        self.size = board.shape[-1]
+        suits = masks[4]
+        self.suit_counts = [COUNT[(suits >> (16 * suit)) & 0x1fff] for suit in range(4)]
+
+    def score(self, holdings):
+        '''
+        Returns the score of each holding's cards together with the board.
+        '''
+        holdings = card_indices(holdings)
+        if holdings.ndim == 1:
+            holdings = holdings[np.newaxis]
+        size = holdings.shape[1]
+        keys = np.sort(holdings // 4, axis=1) @ 13 ** np.arange(size)  # the ranks held, in base 13
+        present = np.zeros(13 ** size, dtype=bool)
+        present[keys] = True
+        distinct = np.flatnonzero(present)
+        position = np.zeros(13 ** size, dtype=np.intp)
+        position[distinct] = np.arange(len(distinct))
+        masks = self.masks
+        for i in range(size):
+            masks = add_cards(masks, 4 * (distinct // 13 ** i % 13))  # any suit will do with flushes left out
+        values = score(masks, [])[..., position[keys]]
+        held = None
+        for suit in range(4):
+            if (self.suit_counts[suit] + size < 5).all():
+                continue
+            if held is None:
+                held = np.bitwise_or.reduce(SUIT_BITS[holdings], axis=1)
+            possible = self.suit_counts[suit] + COUNT[(held >> (16 * suit)) & 0x1fff] >= 5
+            if not possible.any():
+                continue
+            where = np.nonzero(possible)
+            lanes = np.broadcast_to(self.masks[4], possible.shape)[where] | held[where[-1]]
+            lane = (lanes >> (16 * suit)) & 0x1fff
+            straight = STRAIGHT_RANK[lane]
+            flush = np.where(straight != 0, STRAIGHT_FLUSH | straight << 16, FLUSH | TOP5[lane])
+            values[where] = np.maximum(values[where], flush)  # a flush only counts if it beats the rest
+        return values
@@ -0,0 +1,55 @@
+'''
+The preflop equity table in preflop_equity.bin, generated by build_preflop.py in the repository root.
+'''
+import struct
+import sys
+from array import array
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+MAGIC = b'PFE3'
+NUM_HANDS = 22100  # 52 choose 3
+
+
+def hand_index(cards):
+    '''
+    Returns the position of a 3-card hand in the table, whatever the order of its cards.
+    '''
+    a, b, c = sorted(4 * RANKS.index(card[0]) + SUITS.index(card[1]) for card in cards)
+    return a + b * (b - 1) // 2 + c * (c - 1) * (c - 2) // 6
+
+
+class PreflopTable():
+    '''
+    The equity of every 3-card starting hand against a random hand, as the small blind
+    (active 0) and as the big blind (active 1), playing through both discards to showdown.
+
+    Hands that differ only by their suits share a class, numbered from 0 to num_classes - 1,
+    which also makes a handy bucket for preflop strategies.
+    '''
+
+    def __init__(self, path='preflop_equity.bin'):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, self.num_classes, self.samples = struct.unpack_from('<4sII', data)
+        if magic != MAGIC:
+            raise ValueError('{} is not a preflop equity table'.format(path))
+        offset = struct.calcsize('<4sII')
+        self.classes = array('H', data[offset:offset + 2 * NUM_HANDS])
+        offset += 2 * NUM_HANDS
+        self.equities = array('H', data[offset:offset + 4 * self.num_classes])
+        if sys.byteorder == 'big':
+            self.classes.byteswap()
+            self.equities.byteswap()
+
+    def hand_class(self, cards):
+        '''
+        Returns the class of a 3-card hand.
+        '''
+        return self.classes[hand_index(cards)]
+
+    def equity(self, cards, active):
+        '''
+        Returns the share of the pot a 3-card hand wins on average as player active.
+        '''
+        return self.equities[2 * self.hand_class(cards) + active] / 65535
@@ -0,0 +1,204 @@
+'''
+The opponent's range as a weight on every combination of hole cards they could hold, kept
+up to date from the round's history with vectorized NumPy updates. Needs numpy.
+'''
+import itertools
+import math
+import random
+import numpy as np
+from .evaluator import BoardContext, INDEX
+HOLDINGS = {size: np.array(list(itertools.combinations(range(52), size)), dtype=np.intp) for size in (2, 3)}
+MASKS = {size: np.bitwise_or.reduce(np.left_shift(np.uint64(1), holdings.astype(np.uint64)), axis=1)
+         for size, holdings in HOLDINGS.items()}
+PAIR_INDEX = np.full((52, 52), -1, dtype=np.intp)  # two card indices -> row of HOLDINGS[2]
+PAIR_INDEX[HOLDINGS[2][:, 0], HOLDINGS[2][:, 1]] = np.arange(len(HOLDINGS[2]))
+PAIR_INDEX[HOLDINGS[2][:, 1], HOLDINGS[2][:, 0]] = np.arange(len(HOLDINGS[2]))
+
+
+def card_mask(cards):
+    '''
+    Returns the bit mask of a list of cards in common format.
+    '''
+    mask = 0
+    for card in cards:
+        mask |= 1 << INDEX[card]
+    return np.uint64(mask)
+
+
+def likelihood(code, strength):
+    '''
+    A deliberately simple model of how likely the opponent is to take an action ('R', 'C' or 'K')
+    with hands of the given strengths, 0 to 1 within their range. Replace it with your own by
+    passing the result to OpponentRange.update instead.
+    '''
+    if code == 'R':
+        return 0.05 + strength ** 2
+    if code == 'C':
+        return 0.3 + 0.7 * strength
+    return 1.2 - strength
+
+
+class OpponentRange():
+    '''
+    A weight for every hand the opponent could hold, given your cards and the board.
+
+    The opponent starts with three cards, so the range covers all 3-card holdings until they
+    discard. Their discard reveals one of the three, and the range collapses to the 2-card
+    holdings that go with it. Cards you can see are removed with one mask test per holding,
+    and each opponent action multiplies every weight by how likely that holding was to take it.
+    Call track(round_state, active) from get_action and handle_round_over to apply everything
+    that happened since the last call.
+    '''
+
+    def __init__(self, my_cards):
+        self.size = 3
+        self.weights = np.ones(len(HOLDINGS[3]))
+        self.dead = np.uint64(0)
+        self.seen = 0  # how many states of the current round have been applied
+        self.runouts = None  # the runouts equity last sampled and the hands it scored on them
+        self.remove(my_cards)
+
+    @property
+    def holdings(self):
+        '''
+        The card indices of each holding, one row per weight.
+        '''
+        return HOLDINGS[self.size]
+
+    def remove(self, cards):
+        '''
+        Drops every holding that contains one of these cards.
+        '''
+        dead = card_mask(cards) & ~self.dead
+        if dead:
+            self.weights[(MASKS[self.size] & dead) != 0] = 0.
+            self.dead |= dead
+
+    def normalize(self):
+        total = self.weights.sum()
+        if total > 0:
+            self.weights /= total
+
+    def update(self, likelihoods):
+        '''
+        Multiplies each holding's weight by how likely it was to produce what was observed.
+        '''
+        self.weights *= likelihoods
+        self.normalize()
+
+    def reveal_discard(self, card):
+        '''
+        Collapses the 3-card range to the 2-card holdings left after the opponent discarded card,
+        assuming any of their three cards was equally likely to be discarded.
+        '''
+        if self.size == 2:
+            return
+        held = (MASKS[3] & card_mask([card])) != 0
+        kept = np.sort(HOLDINGS[3][held], axis=1)
+        kept = kept[kept != INDEX[card]].reshape(-1, 2)
+        self.weights = np.bincount(PAIR_INDEX[kept[:, 0], kept[:, 1]], weights=self.weights[held],
+                                   minlength=len(HOLDINGS[2]))
+        self.size = 2
+        self.normalize()
+
+    def values(self, board):
+        '''
+        Returns a hand value per holding on this board (higher is better), 0 for holdings no longer possible.
+        With too few cards to evaluate, a rough preflop score is used instead.
+        '''
+        values = np.zeros(len(self.weights))
+        live = np.flatnonzero(self.weights)
+        if len(board) + self.size >= 5:
+            values[live] = BoardContext(board).score(self.holdings[live])
+            return values
+        ranks = self.holdings[live] // 4  # ascending within each holding, like the card indices
+        suits = self.holdings[live] % 4
+        paired = np.zeros(len(live), dtype=bool)
+        suited = np.zeros(len(live), dtype=bool)
+        for a, b in itertools.combinations(range(self.size), 2):
+            paired |= ranks[:, a] == ranks[:, b]
+            suited |= suits[:, a] == suits[:, b]
+        values[live] = 20 * paired + ranks[:, -1] + 0.5 * ranks[:, -2] + 2 * suited
+        return values
+
+    def strengths(self, board):
+        '''
+        Returns each holding's strength on this board as the share of the range it beats, from 0 to 1.
+        '''
+        values = self.values(board)
+        order = np.argsort(values, kind='stable')
+        strengths = np.empty(len(values))
+        strengths[order] = np.cumsum(self.weights[order]) - self.weights[order] / 2
+        return strengths / max(self.weights.sum(), 1e-12)
+
+    def track(self, round_state, active):
+        '''
+        Applies the cards and opponent actions since the last call, from the round state's history.
+        '''
+        states = []
+        state = round_state.previous_state if not hasattr(round_state, 'button') else round_state
+        while state is not None:
+            states.append(state)
+            state = state.previous_state
+        states.reverse()
+        opponent = 1 - active
+        for before, after in zip(states[max(self.seen - 1, 0):], states[max(self.seen, 1):]):
+            if before.button % 2 != opponent or before.street in (2, 3):
+                continue  # discards are read off the board below
+            paid = before.stacks[opponent] - after.stacks[opponent]
+            continue_cost = before.pips[active] - before.pips[opponent]
+            code = 'K' if paid == 0 else ('C' if paid == continue_cost else 'R')
+            self.update(likelihood(code, self.strengths(before.board)))
+        self.seen = len(states)
+        board = states[-1].board
+        if self.size == 3 and len(board) > (2 if opponent == 1 else 3):
+            # player 1 discards first, so the first discarded card on the board is theirs
+            self.reveal_discard(board[2 if opponent == 1 else 3])
+        self.remove(board)
+
+    def equity(self, my_cards, board, samples=100, rng=random):
+        '''
+        Returns the share of the pot two hole cards win on average against the 2-card range,
+        over every runout of the six-card board if there are at most samples of them, or over
+        that many random runouts otherwise.
+
+        The results against every holding the opponent could have are kept, so later calls on
+        the same board, with the same cards, reuse the same runouts and only reweight by the range.
+        '''
+        if self.size != 2:
+            raise ValueError('equity needs the range after the opponent has discarded')
+        key = (tuple(my_cards), tuple(board), samples)
+        if self.runouts is None or self.runouts[0] != key:
+            self.runouts = (key,) + self.score_runouts(my_cards, board, samples, rng)
+        _, holdings, counts, wins = self.runouts
+        weights = self.weights[holdings]
+        total = counts @ weights
+        if total == 0:
+            return 0.5
+        return float(wins @ weights / total)
+
+    def score_runouts(self, my_cards, board, samples, rng):
+        '''
+        Samples the runouts for equity. Returns the holdings not blocked by the known cards, how
+        many runouts leave each of them possible, and the pots our cards win against each of them
+        over those runouts, counting a tie as half.
+        '''
+        known = [INDEX[card] for card in list(my_cards) + list(board)]
+        deck = [i for i in range(52) if i not in known]
+        size = 6 - len(board)
+        if math.comb(len(deck), size) <= samples:
+            runouts = list(itertools.combinations(deck, size))
+        else:
+            chosen = set()
+            while len(chosen) < samples:
+                chosen.add(tuple(sorted(rng.sample(deck, size))))
+            runouts = sorted(chosen)
+        holdings = np.flatnonzero((MASKS[2] & card_mask(list(my_cards) + list(board))) == 0)
+        boards = np.array([known[len(my_cards):] + list(runout) for runout in runouts], dtype=np.intp)
+        context = BoardContext(boards)
+        mine = context.score(known[:len(my_cards)])  # (runouts, 1)
+        theirs = context.score(HOLDINGS[2][holdings])  # (runouts, holdings)
+        runout_masks = np.bitwise_or.reduce(np.left_shift(np.uint64(1), boards.astype(np.uint64)), axis=1)
+        possible = (MASKS[2][holdings] & runout_masks[:, np.newaxis]) == 0
+        wins = np.where(possible, (mine > theirs) + 0.5 * (mine == theirs), 0.)
+        return holdings, possible.sum(axis=0).astype(float), wins.sum(axis=0)
@@ -2,11 +2,19 @@
 The infrastructure for interacting with the engine.
 '''
 import argparse
+import gc
 import socket
+import sys
+import threading
+import time
 from .actions import FoldAction, CallAction, CheckAction, RaiseAction, DiscardAction
 from .states import GameState, TerminalState, RoundState
 from .states import STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from .bot import Bot
+from .budget import TimeBudget
+from .shm import ShmChannel
+
+PONDER_SWITCH_INTERVAL = 0.0005  # seconds between GIL handoffs while pondering, so messages are read promptly
 
 
 class Runner():
@@ -14,23 +22,67 @@ class Runner():
     Interacts with the engine.
     '''
 
-    def __init__(self, pokerbot, socketfile):
+    def __init__(self, pokerbot, socketfile, sock=None):
         self.pokerbot = pokerbot
         self.socketfile = socketfile
+        self.sock = sock  # watched for disconnects if the engine switches to shared memory
+        if pokerbot.budget is None:
+            pokerbot.budget = TimeBudget()
+        self.budget = pokerbot.budget
+        self.pondering = type(pokerbot).ponder is not Bot.ponder
+        self.stop = threading.Event()
+        self.worker = None
+        if pokerbot.manual_gc:
+            # everything built in __init__ lives for the whole game; keep it out of every later collection
+            gc.collect()
+            gc.freeze()
+            gc.disable()
 
     def receive(self):
         '''
         Generator for incoming messages from the engine.
         '''
         while True:
-            packet = self.socketfile.readline().strip().split(' ')
+            line = self.socketfile.readline()
+            self.stop_pondering()
+            packet = line.strip().split(' ')
             if not packet:
                 break
             yield packet
 
-    def send(self, action):
+    def ponder(self, game_state):
         '''
-        Encodes an action and sends it to the engine.
+        Runs the pokerbot's ponder method on a worker thread until the next message, if it has one.
+        '''
+        if self.pondering:
+            self.stop.clear()
+            self.switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(PONDER_SWITCH_INTERVAL)
+            self.worker = threading.Thread(target=self.pokerbot.ponder, args=(game_state, self.stop), daemon=True)
+            self.worker.start()
+
+    def stop_pondering(self):
+        '''
+        Signals the pondering worker to stop and waits for it.
+        '''
+        if self.worker is not None:
+            self.stop.set()
+            self.worker.join()
+            self.worker = None
+            sys.setswitchinterval(self.switch_interval)
+
+    def collect(self, round_num):
+        '''
+        Collects garbage after a round, once the response has been sent, and logs how long it took.
+        '''
+        start = time.perf_counter()
+        collected = gc.collect()
+        print('Round {}: gc collected {} objects in {:.2f} ms'.format(
+            round_num, collected, 1000 * (time.perf_counter() - start)))
+
+    def encode(self, action):
+        '''
+        Encodes an action as a clause for the engine.
         '''
         if isinstance(action, FoldAction):
             code = 'F'
@@ -42,7 +94,33 @@ class Runner():
             code = 'D' + str(action.card)## action.card is the index of the action card in the player's hand
         else:  # isinstance(action, RaiseAction)
             code = 'R' + str(action.amount)
-        self.socketfile.write(code + '\n')
+        return code
+
+    def send(self, action):
+        '''
+        Encodes an action and sends it to the engine.
+        '''
+        self.socketfile.write(self.encode(action) + '\n')
+        self.socketfile.flush()
+
+    def send_batch(self, game_state, tables, order):
+        '''
+        Answers a batched message with one action per table, in the order the tables were listed.
+        '''
+        round_states = {}
+        actives = {}
+        for table in order:
+            round_state, active, round_flag = tables[table]
+            if not (round_flag or isinstance(round_state, TerminalState)):
+                round_states[table] = round_state
+                actives[table] = active
+        actions = {}
+        if round_states:
+            self.budget.start(game_state, *round_states.values())
+            actions = self.pokerbot.get_actions(game_state, round_states, actives)
+            self.budget.finish()
+        codes = [self.encode(actions[table]) if table in round_states else 'K' for table in order]
+        self.socketfile.write(' '.join(codes) + '\n')
         self.socketfile.flush()
 
     def run(self):
@@ -53,10 +131,25 @@ class Runner():
         round_state = None
         active = 0
         round_flag = True
+        tables = {}  # table number -> [round_state, active, round_flag], when playing several tables
         for packet in self.receive():
+            order = []
+            round_over = False
             for clause in packet:
-                if clause[0] == 'T':
+                if clause[0] == '#':
+                    # the following clauses belong to another table; switch to its state
+                    if order:
+                        tables[order[-1]] = [round_state, active, round_flag]
+                    order.append(int(clause[1:]))
+                    round_state, active, round_flag = tables.get(order[-1], [None, 0, True])
+                elif clause[0] == 'S':
+                    # the engine moved the connection to shared memory; the ack below goes through it
+                    self.socketfile = ShmChannel(clause[1:], self.sock.dup())
+                elif clause[0] == 'T':
                     game_state = GameState(game_state.bankroll, float(clause[1:]), game_state.round_num)
+                elif clause[0] == 'N':
+                    # a resumed match continues from this round
+                    game_state = GameState(game_state.bankroll, game_state.game_clock, int(clause[1:]))
                 elif clause[0] == 'P':
                     active = int(float(clause[1:]))
                 elif clause[0] == 'H':
@@ -111,14 +204,25 @@ class Runner():
                     self.pokerbot.handle_round_over(game_state, round_state, active)
                     game_state = GameState(game_state.bankroll + delta, game_state.game_clock, game_state.round_num + 1)
                     round_flag = True
+                    round_over = True
                 elif clause[0] == 'Q':
                     return
-            if round_flag or isinstance(round_state, TerminalState):  # ack the engine
+            if order:
+                tables[order[-1]] = [round_state, active, round_flag]
+                self.send_batch(game_state, tables, order)
+            elif round_flag or isinstance(round_state, TerminalState):
+                # ack the engine; with "fused", the end of a round arrives with the next round instead
                 self.send(CheckAction())
             else:
                 ##assert active == round_state.button % 2
+                self.budget.start(game_state, round_state)
                 action = self.pokerbot.get_action(game_state, round_state, active)
+                self.budget.finish()
                 self.send(action)
+            if round_over and self.pokerbot.manual_gc:
+                # often free, but a message arriving meanwhile (e.g. the next round, with "fused") waits for it on the clock
+                self.collect(game_state.round_num - 1)
+            self.ponder(game_state)
 
 
 def parse_args():
@@ -141,7 +245,9 @@ def run_bot(pokerbot, args):
         print('Could not connect to {}:{}'.format(args.host, args.port))
         return
     socketfile = sock.makefile('rw')
-    runner = Runner(pokerbot, socketfile)
+    runner = Runner(pokerbot, socketfile, sock)
     runner.run()
+    if runner.socketfile is not socketfile:
+        runner.socketfile.close()
     socketfile.close()
     sock.close()
@@ -0,0 +1,158 @@
+'''
+A mutable round state for lookahead search from get_action.
+'''
+from .actions import FoldAction, CallAction, CheckAction, RaiseAction, DiscardAction
+from .states import STARTING_STACK, BIG_BLIND
+
+STRIDE = 7  # history slots per applied action: button, street, pips, stacks, discarded index
+
+
+class SearchState():
+    '''
+    A copy of a RoundState that is advanced with apply and rewound with undo.
+
+    The hands and board are copied, so discards during search never touch the real
+    round state, and undo puts a discarded card back at its original index. Each apply
+    saves the previous fields into a history list that only grows past the deepest line
+    searched so far, so a search allocates no new state per node.
+    Chance nodes are left to the search: append sampled board cards to board and pop them
+    off again before undoing past them.
+    '''
+    __slots__ = ('button', 'street', 'pips', 'stacks', 'hands', 'board', 'terminal', 'winner', 'depth', 'history')
+
+    def __init__(self, round_state):
+        self.button = round_state.button
+        self.street = round_state.street
+        self.pips = list(round_state.pips)
+        self.stacks = list(round_state.stacks)
+        self.hands = [list(hand) for hand in round_state.hands]
+        self.board = list(round_state.board)
+        self.terminal = False
+        self.winner = None  # after a fold, the index of the player who did not fold
+        self.depth = 0
+        self.history = []
+
+    def legal_actions(self):
+        '''
+        Returns a set which corresponds to the active player's legal moves.
+        '''
+        active = self.button % 2
+        continue_cost = self.pips[1-active] - self.pips[active]
+        if self.street in (2, 3):
+            return {DiscardAction} if active != self.street % 2 else {CheckAction}
+        if continue_cost == 0:
+            # we can only raise the stakes if both players can afford it
+            bets_forbidden = (self.stacks[0] == 0 or self.stacks[1] == 0)
+            return {CheckAction, FoldAction} if bets_forbidden else {CheckAction, RaiseAction, FoldAction}
+        # similarly, re-raising is only allowed if both players can afford it
+        raises_forbidden = (continue_cost == self.stacks[active] or self.stacks[1-active] == 0)
+        return {FoldAction, CallAction} if raises_forbidden else {FoldAction, CallAction, RaiseAction}
+
+    def raise_bounds(self):
+        '''
+        Returns a tuple of the minimum and maximum legal raises.
+        '''
+        active = self.button % 2
+        continue_cost = self.pips[1-active] - self.pips[active]
+        max_contribution = min(self.stacks[active], self.stacks[1-active] + continue_cost)
+        min_contribution = min(max_contribution, continue_cost + max(continue_cost, BIG_BLIND))
+        return (self.pips[active] + min_contribution, self.pips[active] + max_contribution)
+
+    def payoff(self, winner):
+        '''
+        Returns player 0's bankroll change if winner (0, 1, or 2 for a split pot) takes the pot,
+        as in TerminalState.deltas[0]. After a fold, use payoff(self.winner).
+        '''
+        if winner == 0:
+            return STARTING_STACK - self.stacks[1]
+        if winner == 1:
+            return self.stacks[0] - STARTING_STACK
+        return 0
+
+    def proceed_street(self):
+        '''
+        Resets the pips and moves to the next street, or ends the round at showdown.
+        '''
+        if self.street == 6:
+            self.terminal = True
+            return
+        if self.street == 0:
+            self.street = 2
+            self.button = 1  # Player B discards first, since they are out of position
+        elif self.street == 2:
+            self.street = 3
+            self.button = 0  # Player A discards second
+        else:
+            self.street += 1
+            self.button = 1  # Player B acts first after the discard phase
+        self.pips[0] = self.pips[1] = 0
+
+    def apply(self, action):
+        '''
+        Advances the state by one action performed by the active player, like RoundState.proceed.
+        '''
+        pips = self.pips
+        stacks = self.stacks
+        history = self.history
+        base = self.depth * STRIDE
+        if base == len(history):
+            history.extend([None] * STRIDE)
+        history[base] = self.button
+        history[base + 1] = self.street
+        history[base + 2] = pips[0]
+        history[base + 3] = pips[1]
+        history[base + 4] = stacks[0]
+        history[base + 5] = stacks[1]
+        history[base + 6] = None
+        self.depth += 1
+        active = self.button % 2
+        if isinstance(action, DiscardAction):
+            hand = self.hands[active]
+            if len(hand) != 0:
+                self.board.append(hand.pop(action.card))
+                history[base + 6] = action.card
+            self.button = 1 - active
+        elif isinstance(action, FoldAction):
+            self.terminal = True
+            self.winner = 1 - active
+        elif isinstance(action, CallAction):
+            if self.button == 0:  # sb calls bb
+                self.button = 1
+                pips[0] = pips[1] = BIG_BLIND
+                stacks[0] = stacks[1] = STARTING_STACK - BIG_BLIND
+                return
+            # both players acted
+            contribution = pips[1-active] - pips[active]
+            stacks[active] -= contribution
+            pips[active] += contribution
+            self.button += 1
+            self.proceed_street()
+        elif isinstance(action, CheckAction):
+            if (self.street == 0 and self.button > 0) or self.button > 1 or self.street == 2 or self.street == 3:
+                self.proceed_street()
+            else:
+                self.button += 1
+        else:  # isinstance(action, RaiseAction)
+            contribution = action.amount - pips[active]
+            stacks[active] -= contribution
+            pips[active] += contribution
+            self.button += 1
+
+    def undo(self):
+        '''
+        Reverts the most recent apply, including any card it discarded.
+        '''
+        self.depth -= 1
+        history = self.history
+        base = self.depth * STRIDE
+        self.button = history[base]
+        self.street = history[base + 1]
+        self.pips[0] = history[base + 2]
+        self.pips[1] = history[base + 3]
+        self.stacks[0] = history[base + 4]
+        self.stacks[1] = history[base + 5]
+        card = history[base + 6]
+        if card is not None:
+            self.hands[self.button % 2].insert(card, self.board.pop())
+        self.terminal = False
+        self.winner = None
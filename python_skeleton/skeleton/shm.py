@@ -0,0 +1,108 @@
+'''
+The shared-memory transport, used instead of the socket when the engine offers it.
+'''
+import mmap
+import os
+import select
+import socket
+import time
+
+CAPACITY = 1 << 16  # bytes of data in each direction
+HEADER = 128  # the write and read counters, each on its own cache line
+SPIN = 0.001  # seconds spent spinning before sleeping
+SLEEP = 0.0005  # longest sleep between checks once spinning stops
+
+
+class ShmChannel():
+    '''
+    A file-like pair of ring buffers in the shared memory file set up by the engine.
+
+    The engine-to-bot ring comes first, then the bot-to-engine ring. Each ring starts with a
+    write counter and a read counter on separate cache lines, followed by CAPACITY bytes of data.
+    The socket to the engine stays open only to notice when the engine goes away.
+    '''
+
+    def __init__(self, path, sock):
+        self.sock = sock
+        self.outgoing = []
+        self.incoming = bytearray()
+        fd = os.open(path, os.O_RDWR)
+        try:
+            self.buffer = mmap.mmap(fd, 2 * (HEADER + CAPACITY))
+        finally:
+            os.close(fd)
+        view = memoryview(self.buffer)
+        offset = HEADER + CAPACITY
+        self.recv_counters = view[:HEADER].cast('Q')  # [0] is written, [8] is read
+        self.recv_data = view[HEADER:offset]
+        self.send_counters = view[offset:offset + HEADER].cast('Q')
+        self.send_data = view[offset + HEADER:]
+        self.views = [self.recv_counters, self.recv_data, self.send_counters, self.send_data, view]
+
+    def wait(self, ready):
+        '''
+        Waits until ready() is true. Returns False if the engine closed the connection first.
+        '''
+        spin_until = time.perf_counter() + SPIN
+        while not ready():
+            if time.perf_counter() < spin_until:
+                os.sched_yield()
+            elif select.select([self.sock], [], [], SLEEP)[0] and not self.sock.recv(1, socket.MSG_PEEK):
+                return False
+        return True
+
+    def write(self, text):
+        '''
+        Buffers text until the next flush.
+        '''
+        self.outgoing.append(text)
+
+    def flush(self):
+        '''
+        Copies the buffered text into the bot-to-engine ring.
+        '''
+        data = ''.join(self.outgoing).encode()
+        self.outgoing = []
+        counters = self.send_counters
+        sent = 0
+        while sent < len(data):
+            head = counters[0]
+            free = CAPACITY - (head - counters[8])
+            if free == 0:
+                if not self.wait(lambda: counters[8] + CAPACITY != head):
+                    return
+                continue
+            start = head % CAPACITY
+            size = min(free, len(data) - sent, CAPACITY - start)
+            self.send_data[start:start + size] = data[sent:sent + size]
+            counters[0] = head + size  # publish only after the data is in place
+            sent += size
+
+    def readline(self):
+        '''
+        Returns the next line from the engine, or an empty string once the engine is gone.
+        '''
+        counters = self.recv_counters
+        while True:
+            end = self.incoming.find(b'\n')
+            if end >= 0:
+                line = self.incoming[:end + 1]
+                del self.incoming[:end + 1]
+                return line.decode()
+            tail = counters[8]
+            if not self.wait(lambda: counters[0] != tail):
+                return ''
+            start = tail % CAPACITY
+            size = min(counters[0] - tail, CAPACITY - start)
+            self.incoming += self.recv_data[start:start + size]
+            counters[8] = tail + size
+
+    def close(self):
+        '''
+        Flushes any buffered text and unmaps the rings.
+        '''
+        self.flush()
+        for view in self.views:
+            view.release()
+        self.buffer.close()
+        self.sock.close()
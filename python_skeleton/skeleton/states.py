@@ -128,4 +128,10 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         contribution = action.amount - new_pips[active]
         new_stacks[active] -= contribution
         new_pips[active] += contribution
-        return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.board, self)
\ No newline at end of file
+        return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.board, self)
+
+try:
+    # the compiled RoundState with typed fields, if built with `python3 build.py`
+    from .cstates import RoundState
+except ImportError:
+    pass